@@ -1,24 +1,39 @@
 from __future__ import annotations
 
 # FastAPI service to run on :8003
-from fastapi import FastAPI, Body, Query
+from fastapi import APIRouter, FastAPI, Body, Header, Query, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 import os
 import sys
 import json
+import re
+import heapq
+import hmac
+import threading
+import time as _time
+import uuid
+import base64
+from concurrent.futures import ThreadPoolExecutor, wait as _wait_futures
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
 from datetime import datetime, time
-from typing import Any, Dict, List, Optional, Tuple, DefaultDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, DefaultDict
 from collections import defaultdict
 from fastapi.responses import RedirectResponse, Response
 
+import resources
+from instrumentation import cache_result, instrument, stage, timed
+from profiling import profile_requests
+from serialization import MongoJSONResponse
+
 # 👇 Load env before using os.getenv
 from dotenv import load_dotenv
 load_dotenv()
 
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, UpdateOne
     from bson import ObjectId
 except Exception as e:  # pragma: no cover
     print(json.dumps({"ok": False, "error": f"Missing dependency: {e}"}))
@@ -52,11 +67,46 @@ GUESSES = {
     "users":  ["users", "students", "user", "student", "Users"],
 }
 
+# Resolved-collection cache (pool sizing is in resources.py)
+COLLECTION_CACHE_TTL = float(os.getenv("COLLECTION_CACHE_TTL", "600"))  # seconds; 0 = never expire
+
+# Assignment writes are buffered and flushed with bulk_write in batches
+ASSIGN_BULK_BATCH_SIZE = int(os.getenv("ASSIGN_BULK_BATCH_SIZE", "500"))
+# Schedules are streamed from a cursor; the report keeps counts plus a sample
+SCHEDULE_FETCH_BATCH_SIZE = int(os.getenv("SCHEDULE_FETCH_BATCH_SIZE", "200"))
+ASSIGN_REPORT_SAMPLE = int(os.getenv("ASSIGN_REPORT_SAMPLE", "100"))
+ASSIGN_DIFF_LIMIT = int(os.getenv("ASSIGN_DIFF_LIMIT", "5000"))
+# Instructor availability windows as of the last completed run, per partner scope
+ASSIGN_STATE_COLL = os.getenv("ASSIGN_STATE_COLL", "assignment_state")
+
+# Global solver (mode="global")
+SOLVER_TIME_BUDGET = float(os.getenv("SOLVER_TIME_BUDGET", "20"))  # seconds
+SOLVER_REPAIR_CANDIDATES = int(os.getenv("SOLVER_REPAIR_CANDIDATES", "5"))
+SOLVER_CHECKPOINT_EVERY = int(os.getenv("SOLVER_CHECKPOINT_EVERY", "500"))  # sessions between job checkpoints
+ASSIGN_MODES = ("per_schedule", "global")
+
+# Background assignment jobs
+ASSIGN_JOB_WORKERS = int(os.getenv("ASSIGN_JOB_WORKERS", "2"))
+ASSIGN_JOB_RETENTION = float(os.getenv("ASSIGN_JOB_RETENTION", "3600"))  # seconds finished jobs stay queryable
+ASSIGN_JOB_SHUTDOWN_TIMEOUT = float(os.getenv("ASSIGN_JOB_SHUTDOWN_TIMEOUT", "30"))  # seconds to wait for running jobs
+
+# /api/instructors paging and per-partner page cache
+INSTRUCTOR_PAGE_SIZE = int(os.getenv("INSTRUCTOR_PAGE_SIZE", "50"))
+INSTRUCTOR_MAX_PAGE_SIZE = int(os.getenv("INSTRUCTOR_MAX_PAGE_SIZE", "500"))
+INSTRUCTOR_CACHE_TTL = float(os.getenv("INSTRUCTOR_CACHE_TTL", "60"))  # seconds; 0 disables
+INSTRUCTOR_CACHE_MAX_PAGES = int(os.getenv("INSTRUCTOR_CACHE_MAX_PAGES", "256"))  # per partner
+# Invalidation versions shared by every worker; re-read at most this often (seconds)
+CACHE_VERSIONS_COLL = os.getenv("CACHE_VERSIONS_COLL", "cache_versions")
+INSTRUCTOR_CACHE_VERSION_TTL = float(os.getenv("INSTRUCTOR_CACHE_VERSION_TTL", "1"))
+# Shared secret the Node backend sends as X-Admin-Token to /admin/invalidate-instructors
+ADMIN_TOKEN = os.getenv("AI_BACKEND_ADMIN_TOKEN", "")
+
 # -----------------------------
 # Small helpers
 # -----------------------------
-def _resolve_collection(db, explicit: str, guesses: List[str]) -> str:
-    cols = set(db.list_collection_names())
+def _resolve_collection(db, explicit: str, guesses: List[str], cols: Optional[set] = None) -> str:
+    if cols is None:
+        cols = set(db.list_collection_names())
     if explicit and explicit in cols:
         return explicit
     for g in guesses:
@@ -64,6 +114,81 @@ def _resolve_collection(db, explicit: str, guesses: List[str]) -> str:
             return g
     return guesses[0]
 
+class MongoManager:
+    """
+    The process-wide pooled MongoClient (resources.pymongo_client) plus a
+    cache of resolved collection names, so requests skip the handshake and
+    list_collection_names().
+    """
+
+    def __init__(self, uri: str, db_name: str, ttl: float = COLLECTION_CACHE_TTL):
+        self.uri = uri
+        self.db_name = db_name
+        self.ttl = ttl
+        self._client: Optional[MongoClient] = None
+        self._names: Dict[str, str] = {}
+        self._resolved_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = resources.pymongo_client(self.uri)
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.db_name]
+
+    def _expired(self) -> bool:
+        return self.ttl > 0 and (_time.monotonic() - self._resolved_at) > self.ttl
+
+    def refresh(self) -> Dict[str, str]:
+        db = self.db
+        cols = set(db.list_collection_names())
+        names = {
+            "instructors": _resolve_collection(db, INSTRUCTORS_COLL, GUESSES["instructors"], cols),
+            "schedules":   _resolve_collection(db, SCHEDULES_COLL,   GUESSES["schedules"],   cols),
+            "offers":      _resolve_collection(db, OFFERS_COLL,      GUESSES["offers"],      cols),
+            "users":       _resolve_collection(db, USERS_COLL,       GUESSES["users"],       cols),
+        }
+        with self._lock:
+            self._names = names
+            self._resolved_at = _time.monotonic()
+        return dict(names)
+
+    def collection(self, kind: str):
+        if kind not in self._names or self._expired():
+            self.refresh()
+        return self.db[self._names[kind]]
+
+    def close(self) -> None:
+        with self._lock:
+            self._client = None
+            self._names = {}
+        resources.close_pymongo_clients()
+
+mongo = MongoManager(MONGO_URI, DB_NAME)
+
+class _Sample:
+    """Counts everything appended but only keeps the first `cap` items."""
+
+    def __init__(self, cap: int = ASSIGN_REPORT_SAMPLE):
+        self.cap = max(0, cap)
+        self.items: List[Any] = []
+        self.total = 0
+
+    def append(self, item: Any) -> None:
+        self.total += 1
+        if len(self.items) < self.cap:
+            self.items.append(item)
+
+    @property
+    def truncated(self) -> bool:
+        return self.total > len(self.items)
+
 def _is_blank(x: Any) -> bool:
     return x is None or (isinstance(x, str) and not x.strip())
 
@@ -81,17 +206,32 @@ def _display_name(instr: Dict[str, Any]) -> str:
     nm = f"{fn} {ln}".strip()
     return nm or str(instr.get("_id"))
 
-def _parse_hhmm(s: Optional[str]) -> Optional[time]:
+# Times are handled as integer minute-of-day everywhere in the engine.
+# Accepts "HH:MM" (24h) and "HH:MM AM/PM"; the same few strings repeat
+# across every timetable, so parses are memoized.
+_CLOCK_RE = re.compile(r"^(\d{1,2}):(\d{1,2})(?:\s*([AaPp][Mm]))?$")
+
+@lru_cache(maxsize=4096)
+def _parse_clock(s: str) -> Optional[int]:
+    m = _CLOCK_RE.match(s.strip())
+    if not m:
+        return None
+    hh, mm, ampm = int(m.group(1)), int(m.group(2)), m.group(3)
+    if mm > 59:
+        return None
+    if ampm:
+        if not 1 <= hh <= 12:
+            return None
+        hh = hh % 12 + (12 if ampm.lower() == "pm" else 0)
+    elif hh > 23:
+        return None
+    return hh * 60 + mm
+
+def _parse_hhmm(s: Optional[str]) -> Optional[int]:
     if not s or not isinstance(s, str): return None
-    s = s.strip()
-    for f in ("%H:%M", "%I:%M %p"):
-        try:
-            return datetime.strptime(s, f).time()
-        except Exception:
-            pass
-    return None
+    return _parse_clock(s)
 
-def _extract_availability_window(instr: Dict[str, Any]) -> Tuple[Optional[time], Optional[time]]:
+def _extract_availability_window(instr: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
     """
     Optional availability window on the instructor. If absent, we treat as fully available.
     Supported keys:
@@ -122,38 +262,31 @@ def _extract_availability_window(instr: Dict[str, Any]) -> Tuple[Optional[time],
             end   = end   or avail.get("end")   or avail.get("to")
     return _parse_hhmm(start), _parse_hhmm(end)
 
-def _parse_session_time(v: Any) -> Optional[time]:
+def _parse_session_time(v: Any) -> Optional[int]:
     if not v: return None
-    if isinstance(v, time): return v
+    if isinstance(v, str): return _parse_clock(v)
+    if isinstance(v, time): return v.hour * 60 + v.minute
     if isinstance(v, (int, float)):
-        s = f"{int(v):04d}"
-        hh, mm = int(s[:-2]), int(s[-2:])
-        return time(hh, mm)
-    if isinstance(v, str):
-        v = v.strip()
-        for f in ("%H:%M", "%I:%M %p"):
-            try:
-                return datetime.strptime(v, f).time()
-            except Exception:
-                pass
+        # 930 -> 09:30
+        hh, mm = divmod(int(v), 100)
+        return hh * 60 + mm if hh <= 23 and mm <= 59 else None
     return None
 
-def _session_times(sess: Dict[str, Any]) -> Tuple[Optional[time], Optional[time]]:
+def _session_times(sess: Dict[str, Any]) -> Tuple[Optional[int], Optional[int]]:
     s = sess.get("startTime") or sess.get("start") or sess.get("from")
     e = sess.get("endTime")   or sess.get("end")   or sess.get("to")
     return _parse_session_time(s), _parse_session_time(e)
 
-def _within(a_start: Optional[time], a_end: Optional[time], s: Optional[time], e: Optional[time]) -> bool:
+def _within(a_start: Optional[int], a_end: Optional[int], s: Optional[int], e: Optional[int]) -> bool:
     # If either side lacks times, don't block assignment.
     if s is None or e is None: return True
     if a_start is None or a_end is None: return True
-    si, ei = s.hour*60 + s.minute, e.hour*60 + e.minute
-    ai, bi = a_start.hour*60 + a_start.minute, a_end.hour*60 + a_end.minute
-    return ai <= si and ei <= bi
+    return a_start <= s and e <= a_end
 
 # -----------------------------
 # Core preparation & picking
 # -----------------------------
+@timed("instructor-assignment", "mongo_query")
 def _load_instructors(coll, partner_id: Optional[str] = None) -> List[Dict[str, Any]]:
     # If instructors are tagged with partnerId, filter; otherwise fall back to all
     query: Dict[str, Any] = {}
@@ -193,10 +326,176 @@ def _initial_load_for_internship(instructors: List[Dict[str, Any]], timetable: L
         load[ins["name"]] += 0
     return load
 
+def _has_instructor(sess: Dict[str, Any]) -> bool:
+    return not all(_is_blank(v) for v in (
+        sess.get("instructorId"), (sess.get("instructorInfo") or {}).get("instructorId"),
+        sess.get("instructor"), sess.get("instructorName")))
+
+class _Roster:
+    """Maps a session's existing assignment back to a loaded instructor."""
+
+    def __init__(self, instructors: List[Dict[str, Any]]):
+        self.instructors = instructors
+        self.by_id: Dict[str, int] = {}
+        self.by_name: Dict[str, int] = {}
+        for k, ins in enumerate(instructors):
+            self.by_id.setdefault(str(ins["_id"]), k)
+            raw = ins.get("raw") or {}
+            full = f"{(raw.get('firstName') or '').strip()} {(raw.get('lastName') or '').strip()}".strip()
+            for nm in (ins["name"], full):
+                if nm:
+                    self.by_name.setdefault(nm, k)
+
+    def ids(self) -> List[Any]:
+        return [ins["_id"] for ins in self.instructors]
+
+    def assigned(self, sess: Dict[str, Any]) -> Optional[int]:
+        iid = sess.get("instructorId") or (sess.get("instructorInfo") or {}).get("instructorId")
+        if iid:
+            return self.by_id.get(str(iid))
+        nm = sess.get("instructor") or sess.get("instructorName")
+        if isinstance(nm, str) and nm.strip():
+            return self.by_name.get(nm.strip())
+        return None
+
+    def keeps(self, sess: Dict[str, Any]) -> Optional[int]:
+        """Index of the still-valid assigned instructor, or None if the session needs one."""
+        k = self.assigned(sess)
+        if k is None:
+            return None
+        ins = self.instructors[k]
+        s, e = _session_times(sess)
+        return k if _within(ins["a_start"], ins["a_end"], s, e) else None
+
+class _InstructorIndex:
+    """
+    Availability-bucketed, load-ordered instructor lookup.
+
+    Instructors are grouped by their availability window (minute-of-day),
+    with instructors lacking a window in one always-eligible bucket. The
+    windows are kept sorted by start minute so the buckets covering a
+    session are found by bisection, and memoized per distinct session time.
+    Each bucket holds a heap of (load, name, order, idx); loads are read
+    from load_map lazily, so stale heap entries are refreshed when they
+    surface instead of on every increment. A load that drops must be
+    passed to refresh() instead. Picks match _pick_instructor's linear
+    scan: least loaded, then name, then original order.
+    """
+
+    def __init__(self, instructors: List[Dict[str, Any]]):
+        self.instructors = instructors
+        buckets: Dict[Optional[Tuple[int, int]], List[int]] = defaultdict(list)
+        for idx, ins in enumerate(instructors):
+            a, b = ins["a_start"], ins["a_end"]
+            buckets[None if a is None or b is None else (a, b)].append(idx)
+        self._open = buckets.pop(None, [])
+        self._windows = sorted(buckets)                       # [(start, end)], by start
+        self._window_starts = [w[0] for w in self._windows]
+        self._members = [buckets[w] for w in self._windows]
+        # idx -> position of its window in self._windows, None for the open bucket
+        self._home: Dict[int, Optional[int]] = {i: w for w, m in enumerate(self._members) for i in m}
+        self._home.update((i, None) for i in self._open)
+        self._eligible: Dict[Tuple[int, int], List[int]] = {}
+        self._load_map: Dict[str, int] = defaultdict(int)
+        self._heaps: List[List[Tuple[int, str, int]]] = []
+        self._open_heap: List[Tuple[int, str, int]] = []
+        self._all_heap: List[Tuple[int, str, int]] = []
+
+    def _heap(self, members: List[int]) -> List[Tuple[int, str, int]]:
+        h = [(self._load_map[self.instructors[i]["name"]], self.instructors[i]["name"], i) for i in members]
+        heapq.heapify(h)
+        return h
+
+    def reset(self, load_map: DefaultDict[str, int]) -> None:
+        """Rebuilds the heaps against a (new) load map; O(instructors)."""
+        self._load_map = load_map
+        self._heaps = [self._heap(m) for m in self._members]
+        self._open_heap = self._heap(self._open)
+        self._all_heap = self._heap(list(range(len(self.instructors))))
+
+    def refresh(self, idx: int) -> None:
+        """Re-ranks one instructor after its load went down; O(bucket + instructors)."""
+        w = self._home[idx]
+        current = self._load_map[self.instructors[idx]["name"]]
+        for heap in (self._open_heap if w is None else self._heaps[w], self._all_heap):
+            for pos, (_, name, i) in enumerate(heap):
+                if i == idx:
+                    heap[pos] = (current, name, i)
+                    heapq.heapify(heap)
+                    break
+
+    def _eligible_windows(self, s: int, e: int) -> List[int]:
+        key = (s, e)
+        hit = self._eligible.get(key)
+        if hit is None:
+            upto = bisect_right(self._window_starts, s)      # windows starting at or before s
+            hit = [w for w in range(upto) if e <= self._windows[w][1]]
+            self._eligible[key] = hit
+        return hit
+
+    def _top(self, heap: List[Tuple[int, str, int]]) -> Optional[Tuple[int, str, int]]:
+        # Loads only grow between refresh() calls, so a stale top is re-pushed with its current load
+        while heap:
+            load, name, idx = heap[0]
+            current = self._load_map[name]
+            if load == current:
+                return heap[0]
+            heapq.heapreplace(heap, (current, name, idx))
+        return None
+
+    def _heaps_for(self, s: Optional[int], e: Optional[int]) -> List[List[Tuple[int, str, int]]]:
+        if s is None or e is None:
+            return [self._all_heap]
+        heaps = [self._heaps[w] for w in self._eligible_windows(s, e)]
+        if self._open:
+            heaps.append(self._open_heap)
+        if not heaps:
+            heaps = [self._all_heap]  # fallback if no availability data matches
+        return heaps
+
+    def _best(self, heaps: List[List[Tuple[int, str, int]]]):
+        best, best_heap = None, None
+        for h in heaps:
+            top = self._top(h)
+            if top is not None and (best is None or top < best):
+                best, best_heap = top, h
+        return best, best_heap
+
+    def pick(self, s: Optional[int], e: Optional[int]) -> Optional[Dict[str, Any]]:
+        best, _ = self._best(self._heaps_for(s, e))
+        return self.instructors[best[2]] if best else None
+
+    def pick_where(self, s: Optional[int], e: Optional[int],
+                   accept: Callable[[int], bool]) -> Tuple[Optional[int], List[int]]:
+        """
+        Like pick(), but skips instructors (by index) that `accept` rejects.
+        Returns (chosen index or None, rejected indices in pick order).
+        """
+        heaps = self._heaps_for(s, e)
+        popped: List[Tuple[List[Tuple[int, str, int]], Tuple[int, str, int]]] = []
+        rejected: List[int] = []
+        chosen: Optional[int] = None
+        while True:
+            best, best_heap = self._best(heaps)
+            if best is None:
+                break
+            heapq.heappop(best_heap)
+            popped.append((best_heap, best))
+            if accept(best[2]):
+                chosen = best[2]
+                break
+            rejected.append(best[2])
+        for h, entry in popped:
+            heapq.heappush(h, entry)
+        return chosen, rejected
+
 def _pick_instructor(instructors: List[Dict[str, Any]],
                      load_map: DefaultDict[str, int],
-                     s_time: Optional[time],
-                     e_time: Optional[time]) -> Optional[Dict[str, Any]]:
+                     s_time: Optional[int],
+                     e_time: Optional[int],
+                     index: Optional[_InstructorIndex] = None) -> Optional[Dict[str, Any]]:
+    if index is not None:
+        return index.pick(s_time, e_time)
     candidates = [c for c in instructors if _within(c["a_start"], c["a_end"], s_time, e_time)]
     if not candidates:
         candidates = instructors[:]  # fallback if no availability data matches
@@ -204,155 +503,1031 @@ def _pick_instructor(instructors: List[Dict[str, Any]],
     return candidates[0] if candidates else None
 
 # -----------------------------
-# Assignment engine
+# Bulk persistence
 # -----------------------------
-def assign_instructors(partner_id: Optional[str] = None) -> Dict[str, Any]:
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
+class _BulkAssignmentWriter:
+    """
+    Buffers one UpdateOne per changed schedule and flushes them with
+    bulk_write(ordered=False). Only the changed sessions' fields are $set,
+    addressed by session _id via arrayFilters (array index as fallback).
+    """
 
-    instructors_coll = db[_resolve_collection(db, INSTRUCTORS_COLL, GUESSES["instructors"])]
-    schedules_coll   = db[_resolve_collection(db, SCHEDULES_COLL,   GUESSES["schedules"])]
+    def __init__(self, coll, batch_size: int = ASSIGN_BULK_BATCH_SIZE, dry_run: bool = False):
+        self.coll = coll
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.diff = _Sample(ASSIGN_DIFF_LIMIT)
+        self.ops: List[UpdateOne] = []
+        self.ops_total = 0
+        self.batches = 0
+        self.matched = 0
+        self.modified = 0
 
-    instructors = _load_instructors(instructors_coll, partner_id)
+    def add(self, schedule_id: Any, changes: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]) -> None:
+        if not changes:
+            return
+        set_doc: Dict[str, Any] = {"updatedAt": datetime.utcnow()}
+        array_filters: List[Dict[str, Any]] = []
+        for n, (idx, sess, fields) in enumerate(changes):
+            sid = sess.get("_id")
+            if sid is not None:
+                prefix = f"timetable.$[s{n}]"
+                array_filters.append({f"s{n}._id": sid})
+            else:
+                prefix = f"timetable.{idx}"
+            for k, v in fields.items():
+                set_doc[f"{prefix}.{k}"] = v
+        self.ops.append(UpdateOne({"_id": schedule_id}, {"$set": set_doc},
+                                  array_filters=array_filters or None))
+        if len(self.ops) >= self.batch_size:
+            self.flush()
 
-    # 👉 Fetch ALL schedules with timetables (ignore partnerId, restrictions, etc.)
-    schedules = list(schedules_coll.find({"timetable": {"$exists": True, "$ne": []}}))
+    def record(self, sched: Dict[str, Any], idx: int, sess: Dict[str, Any], fields: Dict[str, Any]) -> None:
+        """Dry run: remember what would be written for this session."""
+        self.diff.append({
+            "scheduleId": str(sched.get("_id")),
+            "internshipId": str(sched.get("internshipId")),
+            "sessionIndex": idx,
+            "sessionId": str(sess["_id"]) if sess.get("_id") is not None else None,
+            "date": sess.get("date"),
+            "startTime": sess.get("startTime"),
+            "endTime": sess.get("endTime"),
+            "from": sess.get("instructor") or sess.get("instructorName"),
+            "to": fields["instructor"],
+        })
 
-    total_sessions_assigned = 0
-    per_schedule_reports: List[Dict[str, Any]] = []
-    skipped: List[Dict[str, Any]] = []
+    def flush(self) -> None:
+        if not self.ops:
+            return
+        if self.dry_run:
+            self.ops_total += len(self.ops)
+            self.ops = []
+            return
+        res = self.coll.bulk_write(self.ops, ordered=False)
+        self.ops_total += len(self.ops)
+        self.batches += 1
+        self.matched += res.matched_count
+        self.modified += res.modified_count
+        print(f"[assign] bulk batch={self.batches} ops={len(self.ops)} "
+              f"matched={res.matched_count} modified={res.modified_count}")
+        self.ops = []
 
-    for sched in schedules:
-        timetable: List[Dict[str, Any]] = sched.get("timetable") or []
-        if not timetable:
-            continue
+    def stats(self) -> Dict[str, int]:
+        return {"ops": self.ops_total, "batches": self.batches,
+                "matched": self.matched, "modified": self.modified}
 
-        internship_id = sched.get("internshipId")
-        load_map = _initial_load_for_internship(instructors, timetable)
-
-        sessions_updated = 0
-        changed = False
-
-        for sess in timetable:
-            # 👉 Always assign (overwrite if already exists)
-            # inside the for sess in timetable loop (no “already has instructor” checks)
-            s_time, e_time = _session_times(sess)
-            chosen = _pick_instructor(instructors, load_map, s_time, e_time)
-            if not chosen:
-                skipped.append({
-                    "internshipId": str(internship_id),
-                    "scheduleId": str(sched.get("_id")),
-                    "date": sess.get("date"),
-                    "reason": "No available instructors"
-                })
+# -----------------------------
+# Global solver
+# -----------------------------
+def _date_key(v: Any) -> Optional[str]:
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, str) and v.strip():
+        return v.strip()[:10]
+    return None
+
+class _BookedIntervals:
+    """
+    Non-overlapping sessions booked for one instructor on one date, kept
+    sorted by start minute. Because they never overlap, ends are sorted
+    too, so the sessions overlapping [s, e) are one contiguous run found
+    by bisection.
+    """
+    __slots__ = ("starts", "items")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.items: List[Tuple[int, int, Tuple[int, int]]] = []
+
+    def conflicts(self, s: int, e: int) -> List[Tuple[int, int, Tuple[int, int]]]:
+        out = []
+        j = bisect_left(self.starts, e) - 1
+        while j >= 0 and self.items[j][1] > s:
+            out.append(self.items[j])
+            j -= 1
+        return out
+
+    def add(self, s: int, e: int, ref: Tuple[int, int]) -> None:
+        i = bisect_left(self.starts, s)
+        self.starts.insert(i, s)
+        self.items.insert(i, (s, e, ref))
+
+    def remove(self, s: int, ref: Tuple[int, int]) -> None:
+        i = bisect_left(self.starts, s)
+        while self.items[i][2] != ref:
+            i += 1
+        del self.starts[i]
+        del self.items[i]
+
+def _solve_global(instructors: List[Dict[str, Any]],
+                  index: _InstructorIndex,
+                  schedules: List[Dict[str, Any]],
+                  time_budget: float = SOLVER_TIME_BUDGET,
+                  roster: Optional[_Roster] = None,
+                  checkpoint: Optional[Callable[[int], None]] = None) -> Tuple[Dict[int, Dict[int, Optional[Dict[str, Any]]]], List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Assigns every session of every schedule at once: load is balanced
+    across all schedules and no instructor is booked into two overlapping
+    sessions on the same date. Sessions are placed greedily in (date,
+    start) order on the least-loaded free instructor; when every eligible
+    instructor is busy, a one-step repair tries to move the single
+    blocking session of one of them to another free instructor. Repairs
+    stop once time_budget seconds have passed; greedy placement continues.
+    With a roster (incremental mode), still-valid existing assignments are
+    booked first and left untouched; only the rest are placed.
+    checkpoint, if given, is called with the number of sessions placed so
+    far every SOLVER_CHECKPOINT_EVERY sessions; it may raise to abort.
+    A session that can't be placed but still names an instructor is planned
+    as None (clear it): that booking was not counted while placing, so
+    keeping it could double-book its instructor.
+    Returns (plan by schedule -> session index -> instructor or None, unassigned, stats).
+    """
+    started = _time.monotonic()
+    deadline = started + time_budget
+    load_map: DefaultDict[str, int] = defaultdict(int)
+    for ins in instructors:
+        load_map[ins["name"]] += 0
+    index.reset(load_map)
+
+    sessions: List[Tuple[str, int, int, int, int, Optional[str], Optional[int], Optional[int]]] = []
+    for si, sched in enumerate(schedules):
+        for ti, sess in enumerate(sched.get("timetable") or []):
+            s, e = _session_times(sess)
+            date = _date_key(sess.get("date"))
+            sessions.append((date or "", -1 if s is None else s, -1 if e is None else e,
+                             si, ti, date, s, e))
+    sessions.sort(key=lambda x: x[:5])
+
+    booked: Dict[Tuple[int, str], _BookedIntervals] = {}
+    assigned: Dict[Tuple[int, int], int] = {}
+    fixed: set = set()  # existing assignments kept in incremental mode
+    unassigned: List[Dict[str, Any]] = []
+    cleared: List[Tuple[int, int]] = []  # unplaced sessions whose old instructor is dropped
+    repairs = 0
+    budget_exhausted = False
+
+    def is_free(k: int, date: Optional[str], s: Optional[int], e: Optional[int]) -> bool:
+        if date is None or s is None or e is None:
+            return True  # untimed sessions cannot conflict
+        b = booked.get((k, date))
+        return b is None or not b.conflicts(s, e)
+
+    def book(k: int, ref: Tuple[int, int], date: Optional[str], s: Optional[int], e: Optional[int]) -> None:
+        assigned[ref] = k
+        if date is not None and s is not None and e is not None:
+            booked.setdefault((k, date), _BookedIntervals()).add(s, e, ref)
+
+    def repair(rejected: List[int], date: str, s: int, e: int) -> Optional[int]:
+        nonlocal repairs
+        for c in rejected[:SOLVER_REPAIR_CANDIDATES]:
+            blocking = booked[(c, date)].conflicts(s, e)
+            if len(blocking) != 1:
                 continue
+            bs, be, ref = blocking[0]
+            if ref in fixed:
+                continue
+            d, _ = index.pick_where(bs, be,
+                                    lambda k: k != c and is_free(k, date, bs, be))
+            if d is None:
+                continue
+            booked[(c, date)].remove(bs, ref)
+            load_map[instructors[c]["name"]] -= 1
+            index.refresh(c)
+            book(d, ref, date, bs, be)
+            load_map[instructors[d]["name"]] += 1
+            repairs += 1
+            return c
+        return None
 
-            raw = chosen.get("raw", {}) if isinstance(chosen.get("raw"), dict) else {}
-            first = (raw.get("firstName") or "").strip()
-            last  = (raw.get("lastName")  or "").strip()
-            full_name = f"{first} {last}".strip() or _display_name(raw)
-
-            # ✅ set both fields – some UI uses instructorName
-            sess["instructor"] = full_name
-            sess["instructorName"] = full_name
-            sess["instructorInfo"] = {
-                "firstName": first,
-                "lastName":  last,
-                "instructorId": str(raw.get("_id") or "")
-            }
-            try:
-                sess["instructorId"] = raw["_id"]
-            except Exception:
-                pass
-
-            load_map[chosen["name"]] += 1
-            sessions_updated += 1
-            total_sessions_assigned += 1
-            changed = True
-
-        if changed:
-            res = schedules_coll.update_one(
-                {"_id": sched["_id"]},
-                {"$set": {"timetable": timetable, "updatedAt": datetime.utcnow()}}
-            )
-            print(f"[assign] schedule={sched['_id']} matched={res.matched_count} modified={res.modified_count}")
-            per_schedule_reports.append({
-                "internshipId": str(internship_id),
-                "scheduleId": str(sched["_id"]),
-                "sessionsUpdated": sessions_updated,
-                "fieldsSet": ["instructor", "instructorName"]
+    if roster is not None:
+        pending = []
+        for item in sessions:
+            _, _, _, si, ti, date, s, e = item
+            k = roster.keeps(schedules[si]["timetable"][ti])
+            if k is not None and is_free(k, date, s, e):
+                ref = (si, ti)
+                book(k, ref, date, s, e)
+                fixed.add(ref)
+                load_map[instructors[k]["name"]] += 1
+            else:
+                pending.append(item)
+        sessions = pending
+
+    for n, (_, _, _, si, ti, date, s, e) in enumerate(sessions):
+        if checkpoint is not None and n % SOLVER_CHECKPOINT_EVERY == 0:
+            checkpoint(len(assigned) - len(fixed))
+        ref = (si, ti)
+        k, rejected = index.pick_where(s, e, lambda k: is_free(k, date, s, e))
+        if k is None and rejected:
+            if not budget_exhausted and _time.monotonic() > deadline:
+                budget_exhausted = True
+            if not budget_exhausted:
+                k = repair(rejected, date, s, e)  # rejected => date and times are set
+        if k is None:
+            sched = schedules[si]
+            sess = sched["timetable"][ti]
+            if _has_instructor(sess):
+                # Its old booking was never counted, so it may now overlap one
+                # made here; leave the session unassigned rather than double-booked
+                cleared.append(ref)
+            unassigned.append({
+                "internshipId": str(sched.get("internshipId")),
+                "scheduleId": str(sched.get("_id")),
+                "date": sess.get("date"),
+                "startTime": sess.get("startTime"),
+                "endTime": sess.get("endTime"),
+                "reason": "All eligible instructors are booked at this time" if rejected
+                          else "No available instructors"
             })
+            continue
+        book(k, ref, date, s, e)
+        load_map[instructors[k]["name"]] += 1
+
+    plan: Dict[int, Dict[int, Optional[Dict[str, Any]]]] = defaultdict(dict)
+    for (si, ti), k in assigned.items():
+        if (si, ti) not in fixed:
+            plan[si][ti] = instructors[k]
+    for si, ti in cleared:
+        plan[si][ti] = None
+
+    stats = {
+        "mode": "global",
+        "sessions": len(sessions) + len(fixed),
+        "kept": len(fixed),
+        "assigned": len(assigned) - len(fixed),
+        "unassigned": len(unassigned),
+        "cleared": len(cleared),
+        "repairs": repairs,
+        "budget_exhausted": budget_exhausted,
+        "elapsed_s": round(_time.monotonic() - started, 3),
+    }
+    return plan, unassigned, stats
 
+# -----------------------------
+# Assignment engine
+# -----------------------------
+def _assignment_fields(chosen: Dict[str, Any]) -> Dict[str, Any]:
+    raw = chosen.get("raw", {}) if isinstance(chosen.get("raw"), dict) else {}
+    first = (raw.get("firstName") or "").strip()
+    last  = (raw.get("lastName")  or "").strip()
+    full_name = f"{first} {last}".strip() or _display_name(raw)
+
+    # ✅ set both fields – some UI uses instructorName
+    fields: Dict[str, Any] = {
+        "instructor": full_name,
+        "instructorName": full_name,
+        "instructorInfo": {
+            "firstName": first,
+            "lastName":  last,
+            "instructorId": str(raw.get("_id") or "")
+        },
+    }
+    if "_id" in raw:
+        fields["instructorId"] = raw["_id"]
+    return fields
+
+def _plan_schedule(instructors: List[Dict[str, Any]],
+                   index: _InstructorIndex,
+                   sched: Dict[str, Any],
+                   skipped: List[Dict[str, Any]],
+                   roster: Optional[_Roster] = None) -> Dict[int, Dict[str, Any]]:
+    timetable: List[Dict[str, Any]] = sched.get("timetable") or []
+    load_map = _initial_load_for_internship(instructors, timetable)
+
+    # Incremental: keep valid assignments, only (re)assign the rest
+    todo = list(range(len(timetable)))
+    if roster is not None:
+        todo = [i for i in todo if roster.keeps(timetable[i]) is None]
+        for i in todo:
+            nm = timetable[i].get("instructor") or timetable[i].get("instructorName")
+            if isinstance(nm, str) and nm.strip():
+                load_map[nm.strip()] -= 1  # stale assignment is being replaced
+    index.reset(load_map)
+
+    plan: Dict[int, Dict[str, Any]] = {}
+    for idx in todo:
+        sess = timetable[idx]
+        # 👉 Full runs always assign (overwrite if already exists)
+        s_time, e_time = _session_times(sess)
+        chosen = _pick_instructor(instructors, load_map, s_time, e_time, index)
+        if not chosen:
+            skipped.append({
+                "internshipId": str(sched.get("internshipId")),
+                "scheduleId": str(sched.get("_id")),
+                "date": sess.get("date"),
+                "reason": "No available instructors"
+            })
+            continue
+        plan[idx] = chosen
+        load_map[chosen["name"]] += 1
+    return plan
+
+# Written to a session the global solver could not place (plan value None)
+CLEARED_FIELDS: Dict[str, Any] = {
+    "instructor": None,
+    "instructorName": None,
+    "instructorInfo": None,
+    "instructorId": None,
+}
+
+def _apply_plan(sched: Dict[str, Any],
+                plan: Dict[int, Optional[Dict[str, Any]]],
+                writer: _BulkAssignmentWriter) -> Optional[Dict[str, Any]]:
+    if not plan:
+        return None
+    timetable: List[Dict[str, Any]] = sched.get("timetable") or []
+    changes: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+    cleared = 0
+    for idx, chosen in sorted(plan.items()):
+        sess = timetable[idx]
+        if chosen is None:
+            fields = dict(CLEARED_FIELDS)
+            cleared += 1
+        else:
+            fields = _assignment_fields(chosen)
+        # Only sessions whose values actually change are written
+        if any(sess.get(k) != v for k, v in fields.items()):
+            if writer.dry_run:
+                writer.record(sched, idx, sess, fields)
+            changes.append((idx, sess, fields))
+            sess.update(fields)
+    writer.add(sched["_id"], changes)
     return {
+        "internshipId": str(sched.get("internshipId")),
+        "scheduleId": str(sched["_id"]),
+        "sessionsUpdated": len(plan) - cleared,
+        "sessionsCleared": cleared,
+        "sessionsWritten": len(changes),
+        "fieldsSet": ["instructor", "instructorName"]
+    }
+
+# Only what planning, the incremental roster checks and the diff read
+SCHEDULE_PROJECTION = {
+    "internshipId": 1,
+    **{f"timetable.{k}": 1 for k in (
+        "_id", "date", "startTime", "endTime", "start", "end", "from", "to",
+        "instructor", "instructorName", "instructorId", "instructorInfo",
+    )},
+}
+
+def _id_match(value: str) -> Dict[str, Any]:
+    # Ids may be stored as ObjectId or as plain strings
+    return {"$in": [ObjectId(value), value]} if ObjectId.is_valid(value) else {"$eq": value}
+
+def _schedule_query(partner_id: Optional[str],
+                    internship_id: Optional[str],
+                    roster: Optional[_Roster],
+                    changed_ids: Sequence[Any] = ()) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"timetable": {"$exists": True, "$ne": []}}
+    if partner_id:
+        query["partnerId"] = _id_match(partner_id)
+    if internship_id:
+        query["internshipId"] = _id_match(internship_id)
+    if roster is not None:
+        # Incremental: only schedules with an unassigned session, or one whose
+        # instructor left the roster or had their availability window changed,
+        # need to be read at all
+        clauses: List[Dict[str, Any]] = [
+            {"instructorId": {"$exists": False}},
+            {"instructorId": None},
+            {"instructorId": {"$nin": roster.ids()}},
+        ]
+        if changed_ids:
+            clauses.append({"instructorId": {"$in": list(changed_ids)}})
+        query["timetable"] = {"$elemMatch": {"$or": clauses}}
+    return query
+
+def _window_fingerprints(instructors: List[Dict[str, Any]]) -> Dict[str, List[Optional[int]]]:
+    return {str(ins["_id"]): [ins["a_start"], ins["a_end"]] for ins in instructors}
+
+def _changed_window_ids(instructors: List[Dict[str, Any]], scope: str) -> Optional[List[Any]]:
+    """
+    Ids of instructors whose availability window differs from the one saved
+    by the last completed run in this scope (new instructors included), or
+    None if no run has saved one yet.
+    """
+    state = mongo.db[ASSIGN_STATE_COLL].find_one({"_id": scope}, {"windows": 1})
+    if state is None:
+        return None
+    saved = state.get("windows") or {}
+    return [ins["_id"] for ins in instructors if saved.get(str(ins["_id"])) != [ins["a_start"], ins["a_end"]]]
+
+def _save_window_fingerprints(instructors: List[Dict[str, Any]], scope: str) -> None:
+    mongo.db[ASSIGN_STATE_COLL].replace_one(
+        {"_id": scope},
+        {"_id": scope, "windows": _window_fingerprints(instructors), "updatedAt": datetime.utcnow()},
+        upsert=True,
+    )
+
+def ensure_schedule_indexes() -> None:
+    # partnerId-first so partner-scoped runs don't scan; the model's unique
+    # index is {internshipId, partnerId}, which covers internship-scoped runs
+    mongo.collection("schedules").create_index([("partnerId", 1), ("internshipId", 1)])
+
+def ensure_instructor_indexes() -> None:
+    coll = mongo.collection("instructors")
+    coll.create_index([("partnerId", 1), ("_id", 1)])
+    coll.create_index("skills")
+    coll.create_index("specializations")
+    coll.create_index([("firstName", "text"), ("lastName", "text"),
+                       ("skills", "text"), ("specializations", "text")],
+                      name="instructor_search")
+
+@timed("instructor-assignment", "assignment")
+def assign_instructors(partner_id: Optional[str] = None,
+                       batch_size: int = ASSIGN_BULK_BATCH_SIZE,
+                       mode: str = "per_schedule",
+                       time_budget: float = SOLVER_TIME_BUDGET,
+                       internship_id: Optional[str] = None,
+                       incremental: bool = False,
+                       dry_run: bool = False,
+                       job: Optional["AssignJob"] = None) -> Dict[str, Any]:
+    """
+    mode="per_schedule" balances load within each schedule (the original
+    behaviour); mode="global" runs _solve_global across all schedules.
+
+    partner_id / internship_id narrow the schedules read. incremental only
+    touches sessions that are unassigned or whose instructor left the
+    roster or no longer covers the session time (in global mode also ones
+    now double-booked). Per-schedule incremental runs only read schedules
+    with such a session: unassigned, assigned off the roster, or assigned
+    to an instructor whose availability window changed since the last
+    completed run in the same partner scope (saved in ASSIGN_STATE_COLL;
+    with nothing saved yet every schedule is read). dry_run computes the same plan and returns it as a diff
+    without writing anything.
+
+    Per-schedule runs stream schedules from the cursor, so memory stays
+    flat as the collection grows; the global solver needs every booking
+    at once and reads the (projected) schedules up front. The report
+    carries counts plus the first ASSIGN_REPORT_SAMPLE schedule reports
+    and skipped sessions.
+
+    When run as a background job, progress is reported to job after every
+    schedule (and every SOLVER_CHECKPOINT_EVERY sessions while the global
+    solver runs) and a cancel request stops the run there; sessions already
+    assigned are flushed before the cancellation propagates. A run
+    cancelled during the solve has written nothing.
+    """
+    if mode not in ASSIGN_MODES:
+        raise ValueError(f"mode must be one of {ASSIGN_MODES}")
+
+    instructors_coll = mongo.collection("instructors")
+    schedules_coll   = mongo.collection("schedules")
+    writer = _BulkAssignmentWriter(schedules_coll, batch_size, dry_run=dry_run)
+
+    instructors = _load_instructors(instructors_coll, partner_id)
+    index = _InstructorIndex(instructors)
+    roster = _Roster(instructors) if incremental else None
+
+    # The global solver must see every booking in scope to avoid conflicts,
+    # so only per-schedule runs can skip schedules that need no work
+    scope = partner_id or "*"
+    prefilter = roster if mode == "per_schedule" else None
+    changed_ids: Optional[List[Any]] = None
+    if prefilter is not None:
+        changed_ids = _changed_window_ids(instructors, scope)
+        if changed_ids is None:
+            prefilter = None  # no saved windows to compare against: read everything
+    cursor = schedules_coll.find(_schedule_query(partner_id, internship_id, prefilter, changed_ids or ()),
+                                 SCHEDULE_PROJECTION, batch_size=SCHEDULE_FETCH_BATCH_SIZE)
+
+    per_schedule_reports = _Sample()
+    skipped = _Sample()
+    solver_stats: Optional[Dict[str, Any]] = None
+    schedules_total: Optional[int] = None
+
+    if mode == "global":
+        schedules = list(cursor)
+        schedules_total = len(schedules)
+        solver_checkpoint = None
+        if job is not None:
+            job.checkpoint(phase="solving", schedules_total=schedules_total)
+            def solver_checkpoint(placed: int) -> None:
+                job.checkpoint(phase="solving", sessions_assigned=placed)
+        global_plan, unassigned, solver_stats = _solve_global(instructors, index, schedules, time_budget,
+                                                              roster, solver_checkpoint)
+        for entry in unassigned:
+            skipped.append(entry)
+        del unassigned
+        source = iter(schedules)
+    else:
+        source = iter(cursor)
+
+    scanned = 0
+    total_sessions_assigned = 0
+    total_sessions_cleared = 0
+    try:
+        for si, sched in enumerate(source):
+            if job is not None:
+                job.checkpoint(phase="assigning", schedules_total=schedules_total,
+                               schedules_scanned=si, sessions_assigned=total_sessions_assigned)
+            scanned += 1
+            if not sched.get("timetable"):
+                continue
+            if mode == "global":
+                plan = global_plan.pop(si, {})
+            else:
+                plan = _plan_schedule(instructors, index, sched, skipped, roster)
+            report = _apply_plan(sched, plan, writer)
+            if report:
+                per_schedule_reports.append(report)
+                total_sessions_assigned += report["sessionsUpdated"]
+                total_sessions_cleared += report["sessionsCleared"]
+    except JobCancelled:
+        writer.flush()
+        raise
+    finally:
+        cursor.close()
+
+    writer.flush()
+    if not dry_run and not internship_id:
+        # Every schedule in scope now matches these windows; an
+        # internship-scoped run only reconciled part of it
+        _save_window_fingerprints(instructors, scope)
+    if job is not None:
+        job.progress.update(phase="done", schedules_scanned=scanned,
+                            sessions_assigned=total_sessions_assigned)
+
+    result = {
     "ok": True,
+    "mode": mode,
+    "incremental": incremental,
+    "dry_run": dry_run,
     "instructors": len(instructors),
-    "schedules_scanned": len(schedules),
+    "schedules_scanned": scanned,
+    "schedules_updated": per_schedule_reports.total,
     "assignments_made": total_sessions_assigned,
-    "assignments": per_schedule_reports,
-    "skipped": skipped,
+    "assignments_cleared": total_sessions_cleared,
+    "sessions_skipped": skipped.total,
+    "assignments": per_schedule_reports.items,
+    "skipped": skipped.items,
+    "truncated": per_schedule_reports.truncated or skipped.truncated,
     "debug": {
         "db": DB_NAME,
         "instructors_coll": instructors_coll.name,
         "schedules_coll": schedules_coll.name,
         "instructors_found": len(instructors),
-        "schedules_found": len(schedules),
+        "schedules_found": scanned,
+        "bulk_write": writer.stats(),
     },
 }
+    if solver_stats:
+        result["solver"] = solver_stats
+    if dry_run:
+        result["diff"] = writer.diff.items
+        result["diff_total"] = writer.diff.total
+    return result
+
+# -----------------------------
+# Background jobs
+# -----------------------------
+class JobCancelled(Exception):
+    pass
+
+class AssignmentInProgress(Exception):
+    def __init__(self, job: "AssignJob"):
+        super().__init__(f"assignment job {job.id} is already {job.status} for {job.scope}")
+        self.job = job
+
+class AssignJob:
+    """One assign_instructors run: status, live progress and final report."""
+
+    def __init__(self, scope: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.scope = scope
+        self.params = params
+        self.status = "queued"  # queued | running | succeeded | failed | cancelled
+        self.progress: Dict[str, Any] = {"phase": "queued", "schedules_total": None,
+                                         "schedules_scanned": 0, "sessions_assigned": 0}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def checkpoint(self, **progress: Any) -> None:
+        self.progress.update(progress)
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    def snapshot(self, include_result: bool = True) -> Dict[str, Any]:
+        out = {
+            "jobId": self.id,
+            "status": self.status,
+            "scope": self.scope,
+            "params": self.params,
+            "progress": dict(self.progress),
+            "cancelRequested": self.cancel_requested,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+        if self.error:
+            out["error"] = self.error
+        if include_result and self.result is not None:
+            out["result"] = self.result
+        return out
+
+class _JobRegistry:
+    """
+    Runs assignment jobs on a bounded thread pool, at most one per scope:
+    a partner id, or "*" for an unscoped run, which excludes every other
+    job. Finished jobs are kept for ASSIGN_JOB_RETENTION seconds.
+    """
+
+    def __init__(self, workers: int = ASSIGN_JOB_WORKERS, retention: float = ASSIGN_JOB_RETENTION):
+        self.workers = max(1, workers)
+        self.retention = retention
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._jobs: Dict[str, AssignJob] = {}
+        self._active: Dict[str, AssignJob] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix="assign-job")
+        return self._pool
+
+    def _prune(self) -> None:
+        cutoff = datetime.utcnow().timestamp() - self.retention
+        for jid, j in list(self._jobs.items()):
+            if j.done and j.finished_at and j.finished_at.timestamp() < cutoff:
+                del self._jobs[jid]
+
+    def _claim(self, params: Dict[str, Any]) -> AssignJob:
+        scope = params.get("partner_id") or "*"
+        with self._lock:
+            self._prune()
+            busy = self._active.get(scope) or (
+                next(iter(self._active.values()), None) if scope == "*" else self._active.get("*"))
+            if busy is not None:
+                raise AssignmentInProgress(busy)
+            job = AssignJob(scope, params)
+            self._jobs[job.id] = job
+            self._active[scope] = job
+        return job
+
+    def _release(self, job: AssignJob) -> None:
+        with self._lock:
+            if self._active.get(job.scope) is job:
+                del self._active[job.scope]
+
+    def _run(self, job: AssignJob) -> None:
+        try:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                return
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            job.progress["phase"] = "loading"
+            job.result = assign_instructors(**job.params, job=job)
+            job.status = "succeeded"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = f"{type(e).__name__}: {e}"
+            print(f"[assign] job {job.id} failed: {job.error}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._release(job)
+
+    def submit(self, params: Dict[str, Any]) -> AssignJob:
+        job = self._claim(params)
+        job.future = self.pool.submit(self._run, job)
+        return job
+
+    def run_inline(self, params: Dict[str, Any]) -> AssignJob:
+        """Run in the calling thread, still holding the scope lock."""
+        job = self._claim(params)
+        self._run(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[AssignJob]:
+        return self._jobs.get(job_id)
+
+    def list(self, partner_id: Optional[str] = None) -> List[AssignJob]:
+        with self._lock:
+            self._prune()
+            jobs = list(self._jobs.values())
+        if partner_id:
+            jobs = [j for j in jobs if j.scope == partner_id]
+        return sorted(jobs, key=lambda j: j.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[AssignJob]:
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        job.cancel()
+        # Still queued: drop it from the pool without waiting for a worker
+        if job.future is not None and job.future.cancel():
+            job.status = "cancelled"
+            job.finished_at = datetime.utcnow()
+            self._release(job)
+        return job
+
+    def shutdown(self, timeout: float = ASSIGN_JOB_SHUTDOWN_TIMEOUT) -> None:
+        """
+        Cancels every job and waits up to `timeout` seconds for running ones
+        to stop at their next checkpoint. Jobs still running after that are
+        marked failed: whatever they do next runs against a closed client.
+        """
+        running = [job for job in list(self._jobs.values()) if not job.done]
+        for job in running:
+            self.cancel(job.id)
+        futures = [job.future for job in running if job.future is not None and not job.done]
+        if futures:
+            _wait_futures(futures, timeout=timeout)
+        for job in running:
+            if not job.done:
+                job.status = "failed"
+                job.error = f"interrupted by shutdown (still running after {timeout:g}s)"
+                job.finished_at = datetime.utcnow()
+                print(f"[assign] job {job.id} {job.error}")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+jobs = _JobRegistry()
 
 # -----------------------------
 # FastAPI service
 # -----------------------------
 class AssignPayload(BaseModel):
     partnerId: Optional[str] = None
+    internshipId: Optional[str] = None
+    mode: Optional[str] = None
+    incremental: Optional[bool] = None
+    dryRun: Optional[bool] = None
 
-app = FastAPI(title="Instructor Assignment API", version="2.0.0")
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+router = APIRouter(default_response_class=MongoJSONResponse)
 
-@app.get("/health")
-def health():
-    return {"ok": True, "service": "instructor-assignment", "port": 8003}
+@router.on_event("startup")
+def connect_mongo():
+    # Open the pool and resolve collection names once, up front
+    try:
+        mongo.refresh()
+        ensure_schedule_indexes()
+        ensure_instructor_indexes()
+    except Exception as e:
+        print(f"[startup] MongoDB not reachable yet: {e}")
+
+@router.on_event("shutdown")
+def close_mongo():
+    # Cancel jobs and wait (bounded) for them to stop before the client closes
+    jobs.shutdown()
+    mongo.close()
 
-@app.post("/assign-instructors")
+@router.post("/admin/refresh-collections")
+def refresh_collections():
+    return {"ok": True, "collections": mongo.refresh()}
+
+@router.post("/admin/invalidate-instructors")
+def invalidate_instructors(partnerId: Optional[str] = Query(default=None),
+                           x_admin_token: Optional[str] = Header(default=None)):
+    # Called by the Node backend (invalidateInstructorCache) after instructor create/update/delete
+    if not ADMIN_TOKEN or x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token")
+    return {"ok": True, "evicted": instructor_cache.invalidate(partnerId)}
+
+def _assign_params(body: Optional[AssignPayload],
+                   partnerId: Optional[str],
+                   internshipId: Optional[str],
+                   mode: Optional[str],
+                   incremental: Optional[bool],
+                   dryRun: Optional[bool]) -> Dict[str, Any]:
+    body = body or AssignPayload()
+    run_mode = mode or body.mode or "per_schedule"
+    if run_mode not in ASSIGN_MODES:
+        raise HTTPException(status_code=422, detail=f"mode must be one of {ASSIGN_MODES}")
+    return {
+        "partner_id": partnerId or body.partnerId,
+        "internship_id": internshipId or body.internshipId,
+        "mode": run_mode,
+        "incremental": bool(incremental if incremental is not None else body.incremental),
+        "dry_run": bool(dryRun if dryRun is not None else body.dryRun),
+    }
+
+def _busy(e: AssignmentInProgress) -> HTTPException:
+    return HTTPException(status_code=409, detail={"error": str(e), "jobId": e.job.id})
+
+@router.post("/assign-instructors")
 def assign_instructors_http(payload: AssignPayload = Body(default=None),
-                            partnerId: Optional[str] = Query(default=None)):
-    pid = partnerId or (payload.partnerId if payload else None)
-    return assign_instructors(partner_id=pid)
+                            partnerId: Optional[str] = Query(default=None),
+                            internshipId: Optional[str] = Query(default=None),
+                            mode: Optional[str] = Query(default=None, pattern="^(per_schedule|global)$"),
+                            incremental: Optional[bool] = Query(default=None),
+                            dryRun: Optional[bool] = Query(default=None)):
+    # Synchronous run; large datasets should go through /assign-instructors/jobs
+    params = _assign_params(payload, partnerId, internshipId, mode, incremental, dryRun)
+    try:
+        job = jobs.run_inline(params)
+    except AssignmentInProgress as e:
+        raise _busy(e)
+    if job.status != "succeeded":
+        raise HTTPException(status_code=500, detail=job.error or job.status)
+    return MongoJSONResponse(job.result)
 
-@app.get("/assign-instructors")
-def assign_instructors_http_get(partnerId: Optional[str] = Query(default=None)):
-    return assign_instructors(partner_id=partnerId)
+@router.get("/assign-instructors")
+def assign_instructors_http_get():
+    # GET used to run (and write) an assignment; fail loudly rather than
+    # let old callers get a report for a run that never happened
+    raise HTTPException(
+        status_code=405,
+        detail="GET /assign-instructors no longer runs assignments. Use POST /assign-instructors "
+               "(add dryRun=true to preview) or POST /assign-instructors/jobs for a background run.",
+        headers={"Allow": "POST"},
+    )
 
-@app.get("/")
-def root():
-    # Send browser to the interactive docs instead of 404
-    return RedirectResponse(url="/docs")
+@router.post("/assign-instructors/jobs", status_code=202)
+def submit_assign_job(payload: AssignPayload = Body(default=None),
+                      partnerId: Optional[str] = Query(default=None),
+                      internshipId: Optional[str] = Query(default=None),
+                      mode: Optional[str] = Query(default=None, pattern="^(per_schedule|global)$"),
+                      incremental: Optional[bool] = Query(default=None),
+                      dryRun: Optional[bool] = Query(default=None)):
+    params = _assign_params(payload, partnerId, internshipId, mode, incremental, dryRun)
+    try:
+        job = jobs.submit(params)
+    except AssignmentInProgress as e:
+        raise _busy(e)
+    return job.snapshot(include_result=False)
 
-@app.get("/favicon.ico")
-def favicon():
-    # Empty 200 response so the browser doesn't log a 404 for the tab icon
-    return Response(content=b"", media_type="image/x-icon",
-                    headers={"Cache-Control": "public, max-age=86400"})
+@router.get("/assign-instructors/jobs")
+def list_assign_jobs(partnerId: Optional[str] = Query(default=None)):
+    items = [j.snapshot(include_result=False) for j in jobs.list(partnerId)]
+    return {"items": items, "count": len(items)}
+
+@router.get("/assign-instructors/jobs/{job_id}")
+def get_assign_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return MongoJSONResponse(job.snapshot())
+
+@router.delete("/assign-instructors/jobs/{job_id}")
+def cancel_assign_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job.snapshot(include_result=False)
 
 if __name__ == "__main__":
     # Local debug: uvicorn Instructor:app --reload --port 8003
     print(json.dumps(assign_instructors(partner_id=None), default=str))
 
-@app.get("/api/instructors")
-def list_instructors(partnerId: Optional[str] = Query(default=None)):
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
+# -----------------------------
+# Instructor listing
+# -----------------------------
+INSTRUCTOR_PROJECTION = {"firstName": 1, "lastName": 1, "email": 1, "specializations": 1, "skills": 1}
+
+class _InstructorListCache:
+    """
+    /api/instructors pages cached per partner ("*" = unscoped) for
+    INSTRUCTOR_CACHE_TTL seconds, dropped early via invalidate().
+
+    Each worker process has its own pages, but invalidate() also bumps a
+    version document in CACHE_VERSIONS_COLL and pages are only served
+    while the version they were cached under is current. So an
+    invalidation that reaches one gunicorn worker reaches all of them
+    within INSTRUCTOR_CACHE_VERSION_TTL seconds (how long a worker reuses
+    the version it last read).
+    """
+
+    VERSION_ID = "instructors"
+
+    def __init__(self, ttl: float = INSTRUCTOR_CACHE_TTL, max_pages: int = INSTRUCTOR_CACHE_MAX_PAGES,
+                 version_ttl: float = INSTRUCTOR_CACHE_VERSION_TTL):
+        self.ttl = ttl
+        self.max_pages = max(1, max_pages)
+        self.version_ttl = version_ttl
+        self._pages: Dict[str, Dict[Tuple, Tuple[float, Tuple, Dict[str, Any]]]] = {}
+        self._versions: Tuple[float, Dict[str, Any]] = (float("-inf"), {})
+        self._lock = threading.Lock()
+
+    def _version(self, scope: str, refresh: bool = True) -> Optional[Tuple]:
+        """The shared version pages of `scope` are valid for, or None if it can't be read."""
+        read_at, doc = self._versions
+        if refresh and _time.monotonic() - read_at > self.version_ttl:
+            try:
+                doc = mongo.db[CACHE_VERSIONS_COLL].find_one({"_id": self.VERSION_ID}) or {}
+            except Exception as e:
+                print(f"[instructors] cache version unavailable, bypassing cache: {e}")
+                return None
+            self._versions = (_time.monotonic(), doc)
+        partners = doc.get("partners") or {}
+        return (doc.get("version", 0), partners.get(scope, 0), partners.get("*", 0))
+
+    def get(self, scope: str, key: Tuple) -> Optional[Dict[str, Any]]:
+        if self.ttl <= 0:
+            return None
+        version = self._version(scope)
+        with self._lock:
+            hit = self._pages.get(scope, {}).get(key)
+        if hit is None or _time.monotonic() - hit[0] > self.ttl:
+            return None
+        if version is None or hit[1] != version:
+            return None
+        return hit[2]
+
+    def put(self, scope: str, key: Tuple, value: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        # The version get() read before the page was queried; a newer one
+        # could be stamped on a page that predates the invalidation
+        version = self._version(scope, refresh=False)
+        if version is None:
+            return
+        with self._lock:
+            pages = self._pages.setdefault(scope, {})
+            pages.pop(key, None)
+            pages[key] = (_time.monotonic(), version, value)
+            while len(pages) > self.max_pages:
+                pages.pop(next(iter(pages)))
+
+    def invalidate(self, partner_id: Optional[str] = None) -> int:
+        # Partners without tagged instructors list everyone, so a change to
+        # an unscoped instructor has to drop every partner's pages
+        bump = {f"partners.{partner_id}": 1, "partners.*": 1} if partner_id else {"version": 1}
+        mongo.db[CACHE_VERSIONS_COLL].update_one({"_id": self.VERSION_ID}, {"$inc": bump}, upsert=True)
+        with self._lock:
+            self._versions = (float("-inf"), {})  # re-read on the next lookup
+            if partner_id:
+                dropped = [self._pages.pop(s, {}) for s in (partner_id, "*")]
+            else:
+                dropped = list(self._pages.values())
+                self._pages = {}
+        return sum(len(p) for p in dropped)
+
+instructor_cache = _InstructorListCache()
+
+def _encode_instructor_cursor(last_id: Any) -> str:
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+def _instructor_cursor_filter(cursor: str) -> Dict[str, Any]:
+    try:
+        last_id = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not ObjectId.is_valid(last_id):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"_id": {"$gt": ObjectId(last_id)}}
+
+def _instructor_query(coll, partner_id: Optional[str], q: Optional[str], skill: Optional[str]) -> Dict[str, Any]:
+    clauses: List[Dict[str, Any]] = []
+    if partner_id:
+        scoped = {"partnerId": _id_match(partner_id)}
+        # Same fallback as _load_instructors: untagged rosters list everyone
+        if coll.find_one(scoped, {"_id": 1}) is not None:
+            clauses.append(scoped)
+    if q and q.strip():
+        clauses.append({"$text": {"$search": q.strip()}})
+    if skill and skill.strip():
+        clauses.append({"$or": [{"skills": skill.strip()}, {"specializations": skill.strip()}]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+@router.get("/api/instructors")
+def list_instructors(partnerId: Optional[str] = Query(default=None),
+                     q: Optional[str] = Query(default=None, description="Search first/last name, skills, specializations"),
+                     skill: Optional[str] = Query(default=None, description="Exact skill or specialization"),
+                     limit: int = Query(default=INSTRUCTOR_PAGE_SIZE, ge=1, le=INSTRUCTOR_MAX_PAGE_SIZE),
+                     cursor: Optional[str] = Query(default=None)):
+    scope = partnerId or "*"
+    key = (q or "", skill or "", limit, cursor or "")
+    cached = instructor_cache.get(scope, key)
+    cache_result("instructor-assignment", "instructor_pages", cached is not None)
+    if cached is not None:
+        return cached
+
+    instructors_coll = mongo.collection("instructors")
+    query = _instructor_query(instructors_coll, partnerId, q, skill)
+    if cursor:
+        query = {"$and": [query, _instructor_cursor_filter(cursor)]}
+    with stage("instructor-assignment", "mongo_query"):
+        docs = list(instructors_coll.find(query, INSTRUCTOR_PROJECTION).sort("_id", 1).limit(limit + 1))
+    next_cursor = _encode_instructor_cursor(docs[limit - 1]["_id"]) if len(docs) > limit else None
 
-    instructors_coll = db[_resolve_collection(db, INSTRUCTORS_COLL, GUESSES["instructors"])]
-    docs = list(instructors_coll.find({}))
-    
     result = []
-    for ins in docs:
+    for ins in docs[:limit]:
         result.append({
             "_id": str(ins.get("_id")),
             "firstName": ins.get("firstName"),
@@ -362,4 +1537,36 @@ def list_instructors(partnerId: Optional[str] = Query(default=None)):
             "skills": ins.get("skills"),
         })
 
-    return {"items": result, "count": len(result)}
+    page = {"items": result, "count": len(result), "next_cursor": next_cursor}
+    instructor_cache.put(scope, key, page)
+    return page
+
+# -----------------------------
+# Standalone service (uvicorn Instructor:app --port 8003); server.py mounts `router` instead
+# -----------------------------
+app = FastAPI(title="Instructor Assignment API", version="2.0.0", default_response_class=MongoJSONResponse)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.include_router(router)
+instrument(app, "instructor-assignment")
+profile_requests(app, "instructor-assignment")
+
+@app.get("/health")
+def health():
+    return {"ok": True, "service": "instructor-assignment", "port": 8003}
+
+@app.get("/")
+def root():
+    # Send browser to the interactive docs instead of 404
+    return RedirectResponse(url="/docs")
+
+@app.get("/favicon.ico")
+def favicon():
+    # Empty 200 response so the browser doesn't log a 404 for the tab icon
+    return Response(content=b"", media_type="image/x-icon",
+                    headers={"Cache-Control": "public, max-age=86400"})
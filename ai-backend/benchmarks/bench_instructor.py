@@ -0,0 +1,226 @@
+"""
+Benchmarks for the instructor assignment engine (Instructor.py).
+
+Runs assign_instructors end to end against an in-memory Mongo stand-in
+(benchmarks/memdb.py) on synthetic data, plus the two hot helpers on their
+own: _initial_load_for_internship and _pick_instructor (linear scan vs
+_InstructorIndex). Reports wall time, sessions/sec and peak traced memory.
+
+    cd ai-backend
+    python -m benchmarks.bench_instructor
+    python -m benchmarks.bench_instructor --instructors 10,100,1000 \\
+        --sessions 1000,10000,100000 --mode per_schedule,global --repeat 3
+    python -m benchmarks.bench_instructor --json results.json
+
+Peak memory is measured in a separate tracemalloc run so tracing doesn't
+skew the timings; --no-memory skips it.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import random
+import sys
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+
+import Instructor  # noqa: E402
+from benchmarks.common import ints, peak_mib, timed  # noqa: E402
+from benchmarks.memdb import MemoryClient  # noqa: E402
+from benchmarks.synthetic import TIME_FORMATS, make_instructors, make_schedules  # noqa: E402
+
+
+def _quiet(fn: Callable[[], Any]) -> Any:
+    # The engine logs every bulk batch; keep that out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn()
+
+
+class Scenario:
+    def __init__(self, n_instructors: int, n_sessions: int, fmt: str, partners: int,
+                 assigned_share: float, seed: int):
+        self.partner_ids = [ObjectId() for _ in range(max(1, partners))]
+        self.instructors = make_instructors(n_instructors, self.partner_ids, fmt, seed=seed)
+        self.schedules = make_schedules(n_sessions, self.partner_ids, fmt,
+                                        assigned_share=assigned_share,
+                                        instructors=self.instructors, seed=seed)
+        self.n_sessions = sum(len(s["timetable"]) for s in self.schedules)
+        self.client = MemoryClient()
+
+    def load(self) -> None:
+        """Fresh copy of the data in a fresh in-memory db, wired into Instructor.mongo."""
+        self.client = MemoryClient()
+        db = self.client[Instructor.DB_NAME]
+        db["instructuremanagements"].insert_many(copy.deepcopy(self.instructors))
+        db["internshipschedules"].insert_many(copy.deepcopy(self.schedules))
+        Instructor.mongo._client = self.client
+        Instructor.mongo.refresh()
+
+    def prepared_instructors(self) -> List[Dict[str, Any]]:
+        return Instructor._load_instructors(self.client[Instructor.DB_NAME]["instructuremanagements"])
+
+
+def overlapping_bookings(sc: Scenario) -> int:
+    """Pairs of overlapping sessions held by the same instructor on the same date, as stored."""
+    by_slot: Dict[Any, List[Any]] = defaultdict(list)
+    for sched in sc.client[Instructor.DB_NAME]["internshipschedules"].find({}):
+        for sess in sched.get("timetable") or []:
+            s, e = Instructor._session_times(sess)
+            date = Instructor._date_key(sess.get("date"))
+            if sess.get("instructorId") and date and s is not None and e is not None:
+                by_slot[(str(sess["instructorId"]), date)].append((s, e))
+    pairs = 0
+    for spans in by_slot.values():
+        spans.sort()
+        for i, (_, e) in enumerate(spans):
+            for s2, _ in spans[i + 1:]:
+                if s2 >= e:
+                    break
+                pairs += 1
+    return pairs
+
+
+def bench_assign(sc: Scenario, mode: str, args) -> Dict[str, Any]:
+    run = lambda: _quiet(lambda: Instructor.assign_instructors(  # noqa: E731
+        mode=mode, incremental=args.incremental, dry_run=args.dry_run,
+        batch_size=args.batch_size))
+    wall, result = timed(run, args.repeat, setup=sc.load)
+    row = {
+        "bench": "assign_instructors",
+        "mode": mode,
+        "wall_s": round(wall, 4),
+        "sessions_per_s": round(sc.n_sessions / wall) if wall else None,
+        "assigned": result["assignments_made"],
+        "skipped": result["sessions_skipped"],
+        "bulk_ops": result["debug"]["bulk_write"]["ops"],
+    }
+    if mode == "global" and not args.dry_run:
+        # The global solver promises conflict-free bookings; check what it left in the db
+        row["overlaps"] = overlapping_bookings(sc)
+        if row["overlaps"]:
+            raise AssertionError(f"global run left {row['overlaps']} overlapping instructor bookings")
+    if not args.no_memory:
+        row["peak_mib"] = round(peak_mib(run, setup=sc.load), 2)
+    return row
+
+
+def bench_initial_load(sc: Scenario, args) -> Dict[str, Any]:
+    sc.load()
+    instructors = sc.prepared_instructors()
+    timetables = [s["timetable"] for s in sc.schedules]
+    run = lambda: [Instructor._initial_load_for_internship(instructors, tt) for tt in timetables]  # noqa: E731
+    wall, _ = timed(run, args.repeat)
+    row = {"bench": "_initial_load_for_internship", "wall_s": round(wall, 4),
+           "sessions_per_s": round(sc.n_sessions / wall) if wall else None}
+    if not args.no_memory:
+        row["peak_mib"] = round(peak_mib(run), 2)
+    return row
+
+
+def bench_pick(sc: Scenario, args) -> List[Dict[str, Any]]:
+    """Same pick sequence through the linear scan and through the index."""
+    sc.load()
+    instructors = sc.prepared_instructors()
+    rng = random.Random(args.seed)
+    sessions = [s for sched in sc.schedules for s in sched["timetable"]]
+    if args.pick_limit and len(sessions) > args.pick_limit:
+        sessions = rng.sample(sessions, args.pick_limit)
+    times = [Instructor._session_times(s) for s in sessions]
+
+    def picks(use_index: bool) -> Callable[[], int]:
+        def run() -> int:
+            load: Dict[str, int] = defaultdict(int)
+            for ins in instructors:
+                load[ins["name"]] += 0
+            index = Instructor._InstructorIndex(instructors) if use_index else None
+            if index is not None:
+                index.reset(load)
+            made = 0
+            for s, e in times:
+                chosen = Instructor._pick_instructor(instructors, load, s, e, index)
+                if chosen:
+                    load[chosen["name"]] += 1
+                    made += 1
+            return made
+        return run
+
+    rows = []
+    for label, use_index in (("linear", False), ("index", True)):
+        wall, made = timed(picks(use_index), args.repeat)
+        row = {"bench": "_pick_instructor", "mode": label, "wall_s": round(wall, 4),
+               "sessions_per_s": round(len(times) / wall) if wall else None,
+               "picks": len(times), "assigned": made}
+        if not args.no_memory:
+            row["peak_mib"] = round(peak_mib(picks(use_index)), 2)
+        rows.append(row)
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--instructors", default="10,100", help="comma-separated instructor counts")
+    ap.add_argument("--sessions", default="1000,10000", help="comma-separated session counts")
+    ap.add_argument("--mode", default="per_schedule", help="comma-separated: per_schedule,global")
+    ap.add_argument("--formats", default="mixed", choices=TIME_FORMATS, help="time formats in the data")
+    ap.add_argument("--partners", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per measurement (median is reported)")
+    ap.add_argument("--batch-size", type=int, default=Instructor.ASSIGN_BULK_BATCH_SIZE)
+    ap.add_argument("--incremental", action="store_true")
+    ap.add_argument("--assigned-share", type=float, default=0.0,
+                    help="share of sessions pre-assigned (use with --incremental)")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--pick-limit", type=int, default=20000,
+                    help="max sessions for the _pick_instructor micro-benchmark (0 = all)")
+    ap.add_argument("--only", default="assign,initial_load,pick",
+                    help="comma-separated subset of: assign,initial_load,pick")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--json", help="also write the rows to this file")
+    args = ap.parse_args(argv)
+
+    modes = [m.strip() for m in args.mode.split(",") if m.strip()]
+    for m in modes:
+        if m not in Instructor.ASSIGN_MODES:
+            ap.error(f"--mode must be among {Instructor.ASSIGN_MODES}")
+    only = {x.strip() for x in args.only.split(",")}
+
+    rows: List[Dict[str, Any]] = []
+    for n_ins in ints(args.instructors):
+        for n_sess in ints(args.sessions):
+            sc = Scenario(n_ins, n_sess, args.formats, args.partners, args.assigned_share, args.seed)
+            scale = {"instructors": n_ins, "sessions": sc.n_sessions, "schedules": len(sc.schedules)}
+            batch: List[Dict[str, Any]] = []
+            if "assign" in only:
+                batch += [bench_assign(sc, m, args) for m in modes]
+            if "initial_load" in only:
+                batch.append(bench_initial_load(sc, args))
+            if "pick" in only:
+                batch += bench_pick(sc, args)
+            for row in batch:
+                row = {**scale, **row}
+                rows.append(row)
+                print(_format_row(row), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "rows": rows}, f, indent=2)
+    return 0
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    name = row["bench"] + (f"[{row['mode']}]" if row.get("mode") else "")
+    mem = f"  peak={row['peak_mib']:.2f}MiB" if "peak_mib" in row else ""
+    return (f"{name:<38} ins={row['instructors']:<5} sess={row['sessions']:<7} "
+            f"wall={row['wall_s']:.4f}s  {row['sessions_per_s'] or 0:>9,}/s{mem}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Benchmarks for response serialization (serialization.py).
+
+Renders a synthetic shortlist (benchmarks/synthetic.make_shortlist) the
+ways the services used to and the way they do now:
+
+    convert+jsonable  convert_object_ids copy, then FastAPI's jsonable_encoder
+                      and JSONResponse (partner.py, Instructor.py, main.py)
+    convert+orjson    convert_object_ids copy, then ORJSONResponse's render
+                      (recommendation.py)
+    mongo_json        MongoJSONResponse: orjson with the BSON default hook
+    jsonl[old|new]    the NDJSON export, json.dumps(default=str) per line
+                      vs serialization.dumps_lines
+
+Reports median render time and peak traced memory per payload.
+
+    cd ai-backend
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --candidates 100,1000,10000 --repeat 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import orjson  # noqa: E402
+from bson import ObjectId  # noqa: E402
+from bson.decimal128 import Decimal128  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from benchmarks.common import ints, peak_mib, timed  # noqa: E402
+from benchmarks.synthetic import make_shortlist  # noqa: E402
+from serialization import MongoJSONResponse, dumps_lines  # noqa: E402
+
+
+def convert_object_ids(obj):
+    # The per-service helper the responses used to go through
+    if isinstance(obj, list):
+        return [convert_object_ids(item) for item in obj]
+    elif isinstance(obj, dict):
+        return {k: (str(v) if isinstance(v, ObjectId) else convert_object_ids(v)) for k, v in obj.items()}
+    else:
+        return obj
+
+
+def _old_default(obj: Any) -> Any:
+    # jsonable_encoder has no Decimal128 encoder; a service would have needed this one
+    return str(obj.to_decimal()) if isinstance(obj, Decimal128) else str(obj)
+
+
+def renderers(docs: List[Dict[str, Any]]) -> Dict[str, Callable[[], bytes]]:
+    payload = lambda body: {"shortlisted_candidates": body, "next_cursor": None}  # noqa: E731
+    return {
+        "convert+jsonable": lambda: JSONResponse(jsonable_encoder(
+            payload(convert_object_ids(docs)), custom_encoder={Decimal128: _old_default})).body,
+        # ORJSONResponse.render, plus the Decimal128 fallback it lacks
+        "convert+orjson": lambda: orjson.dumps(
+            payload(convert_object_ids(docs)), default=_old_default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+        "mongo_json": lambda: MongoJSONResponse(payload(docs)).body,
+        "jsonl[old]": lambda: "".join(json.dumps(convert_object_ids(d), default=str) + "\n" for d in docs).encode(),
+        "jsonl[new]": lambda: dumps_lines(docs),
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--candidates", default="1000", help="comma-separated shortlist sizes")
+    ap.add_argument("--repeat", type=int, default=10, help="runs per measurement (median is reported)")
+    ap.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--json", help="also write the rows to this file")
+    args = ap.parse_args(argv)
+
+    rows: List[Dict[str, Any]] = []
+    for n in ints(args.candidates):
+        docs = make_shortlist(n, seed=args.seed)
+        fns = renderers(docs)
+        # Same document either way (key order aside)
+        assert json.loads(fns["mongo_json"]()) == json.loads(fns["convert+jsonable"]())
+        for name, fn in fns.items():
+            wall, body = timed(fn, args.repeat)
+            row = {"bench": name, "candidates": n, "wall_ms": round(wall * 1000, 3), "bytes": len(body)}
+            if not args.no_memory:
+                row["peak_mib"] = round(peak_mib(fn), 3)
+            # Relative to the old path for the same output format
+            base = row if name in ("convert+jsonable", "jsonl[old]") else \
+                next(r for r in rows if r["candidates"] == n and r["bench"] == (
+                    "jsonl[old]" if name.startswith("jsonl") else "convert+jsonable"))
+            row["speedup"] = round(base["wall_ms"] / row["wall_ms"], 2) if row["wall_ms"] else None
+            rows.append(row)
+            print(_format_row(row), flush=True)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "rows": rows}, f, indent=2)
+    return 0
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    mem = f"  peak={row['peak_mib']:.3f}MiB" if "peak_mib" in row else ""
+    return (f"{row['bench']:<18} n={row['candidates']:<6} wall={row['wall_ms']:>9.3f}ms  "
+            f"x{row['speedup'] or 1:<6} {row['bytes']:>9,}B{mem}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+"""Timing and memory helpers shared by the benchmark scripts."""
+from __future__ import annotations
+
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+
+def ints(s: str) -> List[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def timed(fn: Callable[[], Any], repeat: int, setup: Callable[[], None] = lambda: None) -> Tuple[float, Any]:
+    """Median wall time over `repeat` runs, with setup() outside the timing."""
+    times, out = [], None
+    for _ in range(max(1, repeat)):
+        setup()
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), out
+
+
+def peak_mib(fn: Callable[[], Any], setup: Callable[[], None] = lambda: None) -> float:
+    setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
@@ -0,0 +1,324 @@
+"""
+Minimal in-memory stand-in for the pymongo client, covering just what the
+instructor assignment path uses: find (filter, projection, batch_size,
+sort, limit), find_one, count_documents, insert_many, bulk_write of
+UpdateOne with $set (dotted, positional index and $[name] arrayFilters),
+create_index and list_collection_names.
+
+Filters support equality plus $eq/$ne/$in/$nin/$exists/$gt/$gte/$lt/$lte/
+$elemMatch/$or/$and. It is meant for benchmarking, not as a general mock.
+"""
+from __future__ import annotations
+
+import copy
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_MISSING = object()
+
+
+# -----------------------------
+# Matching
+# -----------------------------
+def _get(doc: Any, path: str) -> Any:
+    cur = doc
+    for part in path.split("."):
+        if isinstance(cur, dict):
+            cur = cur.get(part, _MISSING)
+        elif isinstance(cur, list) and part.isdigit():
+            i = int(part)
+            cur = cur[i] if i < len(cur) else _MISSING
+        else:
+            return _MISSING
+        if cur is _MISSING:
+            return _MISSING
+    return cur
+
+
+def _eq(value: Any, target: Any) -> bool:
+    if value is _MISSING:
+        return target is None
+    if isinstance(value, list) and not isinstance(target, list):
+        return any(v == target for v in value)
+    return value == target
+
+
+def _cmp(value: Any, target: Any, op: str) -> bool:
+    if value is _MISSING or value is None:
+        return False
+    try:
+        if op == "$gt":
+            return value > target
+        if op == "$gte":
+            return value >= target
+        if op == "$lt":
+            return value < target
+        return value <= target
+    except TypeError:
+        return False
+
+
+def _match_ops(value: Any, spec: Dict[str, Any]) -> bool:
+    for op, arg in spec.items():
+        if op == "$eq":
+            ok = _eq(value, arg)
+        elif op == "$ne":
+            ok = not _eq(value, arg)
+        elif op == "$in":
+            ok = any(_eq(value, a) for a in arg)
+        elif op == "$nin":
+            ok = not any(_eq(value, a) for a in arg)
+        elif op == "$exists":
+            ok = (value is not _MISSING) == bool(arg)
+        elif op in ("$gt", "$gte", "$lt", "$lte"):
+            ok = _cmp(value, arg, op)
+        elif op == "$elemMatch":
+            ok = isinstance(value, list) and any(
+                isinstance(v, dict) and matches(v, arg) for v in value)
+        else:
+            raise NotImplementedError(f"memdb: unsupported operator {op}")
+        if not ok:
+            return False
+    return True
+
+
+def matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in cond):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in cond):
+                return False
+        elif key.startswith("$"):
+            raise NotImplementedError(f"memdb: unsupported operator {key}")
+        elif isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond):
+            if not _match_ops(_get(doc, key), cond):
+                return False
+        elif not _eq(_get(doc, key), cond):
+            return False
+    return True
+
+
+# -----------------------------
+# Projection
+# -----------------------------
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    include = [k for k, v in projection.items() if v]
+    if not include:
+        out = copy.deepcopy(doc)
+        for k in projection:
+            out.pop(k, None)
+        return out
+
+    # {"a": 1, "t.x": 1, "t.y": 1} -> {"a": True, "t": {"x": True, "y": True}}
+    tree: Dict[str, Any] = {}
+    for path in include:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = True
+    if projection.get("_id", 1):
+        tree.setdefault("_id", True)
+    return _apply_tree(doc, tree)
+
+
+def _apply_tree(value: Any, tree: Any) -> Any:
+    if tree is True:
+        return copy.deepcopy(value)
+    if isinstance(value, list):
+        return [_apply_tree(v, tree) for v in value if isinstance(v, (dict, list))]
+    if not isinstance(value, dict):
+        return _MISSING
+    out = {}
+    for k, sub in tree.items():
+        if k in value:
+            v = _apply_tree(value[k], sub)
+            if v is not _MISSING:
+                out[k] = v
+    return out
+
+
+# -----------------------------
+# Updates
+# -----------------------------
+def _set_path(doc: Dict[str, Any], path: str, value: Any,
+              array_filters: Dict[str, Dict[str, Any]]) -> bool:
+    """$set one (possibly positional) path; returns whether anything changed."""
+    parts = path.split(".")
+    targets: List[Any] = [doc]
+    for part in parts[:-1]:
+        nxt: List[Any] = []
+        for t in targets:
+            if part.startswith("$[") and part.endswith("]"):
+                ident = part[2:-1]
+                cond = array_filters.get(ident, {})
+                nxt.extend(e for e in t if isinstance(e, dict) and matches(e, cond))
+            elif isinstance(t, list):
+                nxt.append(t[int(part)])
+            else:
+                nxt.append(t.setdefault(part, {}))
+        targets = nxt
+    last = parts[-1]
+    changed = False
+    for t in targets:
+        if isinstance(t, list):
+            changed = changed or t[int(last)] != value
+            t[int(last)] = value
+        else:
+            changed = changed or t.get(last, _MISSING) != value
+            t[last] = value
+    return changed
+
+
+def _split_array_filters(filters: Optional[List[Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+    # {"s0._id": x} -> {"s0": {"_id": x}}
+    out: Dict[str, Dict[str, Any]] = {}
+    for f in filters or []:
+        for key, cond in f.items():
+            ident, _, rest = key.partition(".")
+            out.setdefault(ident, {})[rest] = cond
+    return out
+
+
+class BulkWriteResult:
+    def __init__(self, matched: int, modified: int):
+        self.matched_count = matched
+        self.modified_count = modified
+
+
+class InsertManyResult:
+    def __init__(self, ids: List[Any]):
+        self.inserted_ids = ids
+
+
+# -----------------------------
+# Collection / cursor / client
+# -----------------------------
+class MemoryCursor:
+    def __init__(self, docs: List[Dict[str, Any]], query, projection, batch_size: int = 0):
+        self._docs = docs
+        self._query = query
+        self._projection = projection
+        self._sort: Optional[List[Tuple[str, int]]] = None
+        self._limit = 0
+        self.batch_size_hint = batch_size
+        self._closed = False
+
+    def sort(self, key, direction: int = 1) -> "MemoryCursor":
+        self._sort = [(key, direction)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, n: int) -> "MemoryCursor":
+        self._limit = n
+        return self
+
+    def batch_size(self, n: int) -> "MemoryCursor":
+        self.batch_size_hint = n
+        return self
+
+    def close(self) -> None:
+        self._closed = True
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        docs: Iterable[Dict[str, Any]] = (d for d in self._docs if matches(d, self._query))
+        if self._sort:
+            docs = list(docs)
+            for key, direction in reversed(self._sort):
+                docs.sort(key=lambda d: _get(d, key), reverse=direction < 0)
+        n = 0
+        for d in docs:
+            if self._closed or (self._limit and n >= self._limit):
+                return
+            n += 1
+            yield _project(d, self._projection)
+
+
+class MemoryCollection:
+    def __init__(self, name: str):
+        self.name = name
+        self.docs: List[Dict[str, Any]] = []
+        self.indexes: List[Any] = []
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+
+    def insert_many(self, docs: Iterable[Dict[str, Any]]) -> InsertManyResult:
+        from bson import ObjectId
+        ids = []
+        for d in docs:
+            d = dict(d)
+            d.setdefault("_id", ObjectId())
+            self.docs.append(d)
+            self._by_id[d["_id"]] = d
+            ids.append(d["_id"])
+        return InsertManyResult(ids)
+
+    def find(self, query=None, projection=None, batch_size: int = 0, **_ignored) -> MemoryCursor:
+        return MemoryCursor(self.docs, query or {}, projection, batch_size)
+
+    def find_one(self, query=None, projection=None) -> Optional[Dict[str, Any]]:
+        return next(iter(self.find(query, projection).limit(1)), None)
+
+    def count_documents(self, query=None) -> int:
+        return sum(1 for d in self.docs if matches(d, query or {}))
+
+    def create_index(self, keys, **kwargs) -> str:
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name") or str(keys)
+
+    def _targets(self, flt: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if set(flt) == {"_id"} and not isinstance(flt["_id"], dict):
+            d = self._by_id.get(flt["_id"])
+            return [d] if d is not None else []
+        return [d for d in self.docs if matches(d, flt)][:1]
+
+    def replace_one(self, flt: Dict[str, Any], doc: Dict[str, Any], upsert: bool = False) -> BulkWriteResult:
+        for old in self._targets(flt):
+            old.clear()
+            old.update(doc)
+            return BulkWriteResult(1, 1)
+        if upsert:
+            self.insert_many([{**flt, **doc}])
+        return BulkWriteResult(0, 0)
+
+    def bulk_write(self, ops, ordered: bool = True) -> BulkWriteResult:
+        matched = modified = 0
+        for op in ops:
+            # pymongo UpdateOne keeps its arguments on private attributes
+            flt, update = op._filter, op._doc
+            filters = _split_array_filters(getattr(op, "_array_filters", None))
+            for doc in self._targets(flt):
+                matched += 1
+                changed = False
+                for path, value in (update.get("$set") or {}).items():
+                    changed = _set_path(doc, path, value, filters) or changed
+                modified += changed
+        return BulkWriteResult(matched, modified)
+
+
+class MemoryDatabase:
+    def __init__(self, name: str):
+        self.name = name
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection(name)
+        return self._collections[name]
+
+    def list_collection_names(self) -> List[str]:
+        return list(self._collections)
+
+
+class MemoryClient:
+    def __init__(self):
+        self._dbs: Dict[str, MemoryDatabase] = {}
+
+    def __getitem__(self, name: str) -> MemoryDatabase:
+        if name not in self._dbs:
+            self._dbs[name] = MemoryDatabase(name)
+        return self._dbs[name]
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,131 @@
+"""
+Synthetic data for the benchmarks: instructors and internship schedules
+for the assignment engine, shortlist records for response serialization.
+
+Availability and session times are spread across the formats the engine
+accepts ("HH:MM", "h:MM AM/PM", workHours dicts, HHMM ints, missing) so
+the parsing paths get exercised the way real data does.
+"""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+
+TIME_FORMATS = ("24h", "12h", "int", "mixed")
+
+
+def _clock(minutes: int, fmt: str, rng: random.Random) -> Any:
+    if fmt == "mixed":
+        fmt = rng.choice(("24h", "24h", "12h", "int"))
+    hh, mm = divmod(minutes, 60)
+    if fmt == "12h":
+        return f"{(hh % 12) or 12}:{mm:02d} {'PM' if hh >= 12 else 'AM'}"
+    if fmt == "int":
+        return hh * 100 + mm
+    return f"{hh:02d}:{mm:02d}"
+
+
+def make_instructors(n: int,
+                     partner_ids: List[ObjectId],
+                     fmt: str = "mixed",
+                     unavailable_share: float = 0.2,
+                     seed: int = 0) -> List[Dict[str, Any]]:
+    """unavailable_share of instructors carry no window (always eligible)."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        doc: Dict[str, Any] = {
+            "_id": ObjectId(),
+            "firstName": f"Instructor{i}",
+            "lastName": rng.choice(("Rao", "Shah", "Iyer", "Khan", "Das")),
+            "email": f"instructor{i}@example.com",
+            "skills": rng.sample(["python", "java", "sql", "react", "ml", "aws"], 2),
+            "partnerId": rng.choice(partner_ids),
+        }
+        if rng.random() >= unavailable_share:
+            start = rng.randrange(7, 14) * 60 + rng.choice((0, 30))
+            end = min(23 * 60 + 30, start + rng.randrange(4, 11) * 60)
+            # Instructors only ever store strings; ints are a session-side format
+            f = {"int": "24h", "mixed": rng.choice(("24h", "12h"))}.get(fmt, fmt)
+            s, e = _clock(start, f, rng), _clock(end, f, rng)
+            if rng.random() < 0.25:
+                doc["workHours"] = {"start": s, "end": e}
+            else:
+                doc["availableStart"], doc["availableEnd"] = s, e
+        docs.append(doc)
+    return docs
+
+
+def make_schedules(sessions: int,
+                   partner_ids: List[ObjectId],
+                   fmt: str = "mixed",
+                   sessions_per_schedule: int = 24,
+                   assigned_share: float = 0.0,
+                   instructors: Optional[List[Dict[str, Any]]] = None,
+                   seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Roughly `sessions` sessions split into schedules of about
+    sessions_per_schedule each. assigned_share of sessions arrive already
+    assigned (to a random instructor) to exercise incremental runs.
+    """
+    rng = random.Random(seed + 1)
+    start_day = datetime(2026, 1, 5)
+    docs = []
+    remaining = sessions
+    while remaining > 0:
+        size = min(remaining, max(1, int(rng.gauss(sessions_per_schedule, sessions_per_schedule / 4))))
+        remaining -= size
+        timetable = []
+        for j in range(size):
+            begin = rng.randrange(8, 20) * 60 + rng.choice((0, 30))
+            sess: Dict[str, Any] = {
+                "_id": ObjectId(),
+                "date": start_day + timedelta(days=j // 2),
+                "startTime": _clock(begin, fmt, rng),
+                "endTime": _clock(min(begin + 60, 23 * 60 + 59), fmt, rng),
+            }
+            if instructors and rng.random() < assigned_share:
+                ins = rng.choice(instructors)
+                name = f"{ins['firstName']} {ins['lastName']}"
+                sess.update({"instructor": name, "instructorName": name, "instructorId": ins["_id"]})
+            timetable.append(sess)
+        docs.append({
+            "_id": ObjectId(),
+            "internshipId": ObjectId(),
+            "partnerId": rng.choice(partner_ids),
+            "timetable": timetable,
+        })
+    return docs
+
+
+def make_shortlist(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Shortlist records shaped like partner.py's, as Motor returns them (ObjectIds, datetimes)."""
+    rng = random.Random(seed + 2)
+    internship_id, admin_id = ObjectId(), ObjectId()
+    skills = ["python", "java", "sql", "react", "ml", "aws", "excel", "figma"]
+    created = datetime(2026, 3, 1, 9, 30)
+    docs = []
+    for i in range(n):
+        semantic, skill = rng.random(), rng.random()
+        docs.append({
+            "_id": ObjectId(),
+            "internship_id": internship_id,
+            "school_admin_id": admin_id,
+            "application_id": ObjectId(),
+            "studentId": ObjectId(),
+            "name": f"Student {i}",
+            "email": f"student{i}@example.com",
+            "resumeUrl": f"https://example.com/resumes/{i}.pdf",
+            "similarity_score": round(0.7 * semantic + 0.3 * skill, 4),
+            "semantic_score": semantic,
+            "skill_score": skill,
+            "matched_skills": rng.sample(skills, rng.randint(0, 4)),
+            "expectedStipend": Decimal128(f"{rng.randrange(5, 40) * 1000}.00"),
+            "text_hash": f"{rng.getrandbits(160):040x}",
+            "created_at": created + timedelta(seconds=i),
+        })
+    return docs
@@ -0,0 +1,51 @@
+"""
+Pre-fork serving for server.py:
+
+    cd ai-backend
+    gunicorn -c gunicorn.conf.py server:app
+
+preload_app imports the app once in the master, with AI_BACKEND_PRELOAD=1
+so the embedding model is loaded there; workers fork from it and share the
+weights copy-on-write instead of each loading its own copy. Mongo and
+Bedrock clients are still opened per worker, on first use.
+
+uvicorn --workers spawns fresh interpreters rather than forking, so it
+can't share the weights; use this config for multi-worker hosts.
+
+Metrics: workers write to PROMETHEUS_MULTIPROC_DIR so /metrics on any
+worker reports the whole server (see instrumentation.py).
+"""
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+os.environ.setdefault("AI_BACKEND_PRELOAD", "1")
+# Must be set before prometheus_client is imported by the app
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "ai-backend-metrics"))
+
+bind = os.getenv("AI_BACKEND_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("AI_BACKEND_WORKERS", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("AI_BACKEND_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("AI_BACKEND_GRACEFUL_TIMEOUT", "30"))
+
+
+def on_starting(server):
+    # Series left over from a previous run would be summed into this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess  # type: ignore
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    # Everything the master loaded goes to the permanent generation, so the
+    # workers' garbage collector doesn't write to (and un-share) those pages
+    gc.freeze()
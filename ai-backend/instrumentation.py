@@ -0,0 +1,130 @@
+"""
+Latency and event metrics shared by the ai-backend services, exposed in
+Prometheus text format on /metrics.
+
+    ai_backend_request_duration_seconds{app,method,route,status}   histogram
+    ai_backend_stage_duration_seconds{service,stage}               histogram
+    ai_backend_cache_requests_total{service,cache,result}          counter
+    ai_backend_errors_total{service,kind}                          counter
+
+Stages are the parts of a request worth separating: text_extraction,
+regex_matching, bedrock, embedding_encode, mongo_query, scoring,
+serialization. Time one with
+
+    with stage("partner", "embedding_encode"):
+        ...
+
+or decorate a function with @timed("partner", "scoring") (sync or async).
+Routes are labelled by their template (/recommendations/{student_id}), so
+ids never become label values.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does) and
+/metrics aggregates every worker; otherwise each process reports its own.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import (  # type: ignore
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# 1 ms .. 2 min; Bedrock calls and large shortlists live at the top end
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+REQUEST_LATENCY = Histogram(
+    "ai_backend_request_duration_seconds", "HTTP request latency",
+    ["app", "method", "route", "status"], buckets=LATENCY_BUCKETS)
+STAGE_LATENCY = Histogram(
+    "ai_backend_stage_duration_seconds", "Time spent in one processing stage of a request",
+    ["service", "stage"], buckets=LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter(
+    "ai_backend_cache_requests", "Cache lookups by outcome (hit/miss)",
+    ["service", "cache", "result"])
+ERRORS = Counter(
+    "ai_backend_errors", "Handled errors by kind (e.g. bedrock)",
+    ["service", "kind"])
+
+# The app serving the current request; labels stages that don't know their service
+current_app: ContextVar[str] = ContextVar("current_app", default="ai-backend")
+
+
+@contextmanager
+def stage(service: str, name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.labels(service, name).observe(time.perf_counter() - start)
+
+
+def timed(service: str, name: str) -> Callable:
+    """Decorator form of stage(); works on plain and async functions."""
+    def wrap(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def run_async(*args, **kwargs):
+                with stage(service, name):
+                    return await fn(*args, **kwargs)
+            return run_async
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with stage(service, name):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+
+def cache_result(service: str, cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(service, cache, "hit" if hit else "miss").inc()
+
+
+def count_error(service: str, kind: str) -> None:
+    ERRORS.labels(service, kind).inc()
+
+
+def metrics_response() -> Response:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrument(app: FastAPI, name: str) -> None:
+    """Request latency middleware plus GET /metrics for one app."""
+
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        token = current_app.set(name)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            REQUEST_LATENCY.labels(name, request.method, getattr(route, "path", "unmatched"),
+                                   str(status)).observe(time.perf_counter() - start)
+            current_app.reset(token)
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return metrics_response()
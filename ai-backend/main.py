@@ -1,174 +1,50 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import APIRouter, FastAPI, File, UploadFile, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import fitz  # PyMuPDF for PDFs
 import docx  # python-docx for DOCX files
 import logging
-import spacy
-import boto3 # type: ignore
 from dotenv import load_dotenv
 import time
 import json
 import re
 import traceback  # For error logging
 from datetime import datetime  # For timestamp utility
+from skills import TECH_SKILLS, normalize_skill_name
+import resources
+from instrumentation import count_error, instrument, stage, timed
+from profiling import profile_requests
+from serialization import MongoJSONResponse
 
 # Load environment variables
 load_dotenv()
-aws_access_key_id = os.getenv("AWS_ACCESS_KEY_ID")
-aws_secret_access_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-aws_region = os.getenv("AWS_REGION")
-if not all([aws_access_key_id, aws_secret_access_key, aws_region]):
-    raise ValueError("Missing AWS credentials or region. Check your .env file!")
-
-# Initialize Bedrock client
-bedrock_client = boto3.client(
-    service_name="bedrock-runtime",
-    region_name=aws_region,
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key
-)
+
+# The Bedrock client (and its AWS credential check) is created on first use
+# by resources.bedrock_client(), shared with the other services in-process
 
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
-
-# CORS Middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Load NLP model
-nlp = spacy.load("en_core_web_sm")
+router = APIRouter(default_response_class=MongoJSONResponse)
 
 # Utility function for current timestamp
 def now():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 # Extract text from PDF
+@timed("skill-analysis", "text_extraction")
 def extract_text_from_pdf(pdf_file):
     pdf_file.file.seek(0)  # Reset file pointer before reading
     doc = fitz.open(stream=pdf_file.file.read(), filetype="pdf")
     return "\n".join(page.get_text() for page in doc)
 
 # Extract text from DOCX
+@timed("skill-analysis", "text_extraction")
 def extract_text_from_docx(docx_file):
     doc = docx.Document(docx_file.file)
     return "\n".join([para.text for para in doc.paragraphs])
 
-# Expanded predefined technical skills to improve extraction
-TECH_SKILLS = {
-    # Programming Languages
-    "python", "java", "javascript", "c++", "c#", "go", "rust", "swift", "kotlin", "scala",
-    "ruby", "php", "typescript", "r", "matlab", "perl", "shell", "bash",
-    
-    # Web Technologies
-    "html", "css", "react", "angular", "vue", "svelte", "node.js", "express.js", 
-    "django", "flask", "spring", "laravel", "rails", "asp.net", "jquery",
-    "bootstrap", "tailwind", "sass", "less", "webpack", "vite",
-    
-    # Databases
-    "sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch", "cassandra",
-    "oracle", "sqlite", "dynamodb", "neo4j", "influxdb",
-    
-    # Cloud & DevOps
-    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "ansible",
-    "jenkins", "gitlab", "github", "ci/cd", "nginx", "apache", "microservices",
-    
-    # Data Science & AI
-    "machine learning", "deep learning", "tensorflow", "pytorch", "keras", "pandas", 
-    "numpy", "scikit-learn", "matplotlib", "seaborn", "jupyter", "anaconda",
-    "spark", "hadoop", "kafka", "airflow", "mlflow",
-    
-    # Quantum Computing
-    "quantum computing", "quantum algorithms", "qubits", "circuit simulation",
-    "quantum gates", "quantum entanglement", "quantum superposition", "qiskit",
-    "cirq", "quantum annealing", "quantum cryptography",
-    
-    # Emerging Technologies
-    "blockchain", "ethereum", "solidity", "web3", "nft", "defi", "smart contracts",
-    "iot", "edge computing", "5g", "ar", "vr", "metaverse",
-    
-    # Tools & Methodologies
-    "git", "agile", "scrum", "kanban", "jira", "confluence", "slack", "teams",
-    "figma", "sketch", "photoshop", "illustrator", "unity", "unreal engine",
-    
-    # APIs & Protocols
-    "rest api", "graphql", "grpc", "websocket", "oauth", "jwt", "soap", "xml", "json",
-    
-    # Testing & Quality
-    "unit testing", "integration testing", "selenium", "cypress", "jest", "mocha",
-    "pytest", "junit", "tdd", "bdd", "code review",
-    
-    # Variations for common skills
-    "expressjs", "express.js", "react.js", "reactjs", "nodejs", "node.js",
-    "vue.js", "vuejs", "angular.js", "angularjs"
-}
-
-# Enhanced normalize skill names for better comparison
-def normalize_skill_name(skill):
-    """Normalize skill names for accurate comparison"""
-    if not skill:
-        return ""
-    
-    # Convert to lowercase and strip whitespace
-    skill = skill.lower().strip()
-    
-    # Remove special characters but keep dots, plus signs, and numbers
-    skill = re.sub(r'[^\w\s.#+]', '', skill)
-    
-    # Replace multiple spaces with single space
-    skill = re.sub(r'\s+', ' ', skill)
-    
-    # Remove spaces around dots
-    skill = re.sub(r'\s*\.\s*', '.', skill)
-    
-    # Handle common variations and synonyms
-    skill_mappings = {
-        "nodejs": "node.js",
-        "node js": "node.js",
-        "expressjs": "express.js",
-        "express js": "express.js",
-        "reactjs": "react.js",
-        "react js": "react.js",
-        "vuejs": "vue.js",
-        "vue js": "vue.js",
-        "angularjs": "angular.js",
-        "angular js": "angular.js",
-        "c sharp": "c#",
-        "c plus plus": "c++",
-        "cpp": "c++",
-        "javascript": "javascript",
-        "js": "javascript",
-        "typescript": "typescript",
-        "ts": "typescript",
-        "artificial intelligence": "machine learning",
-        "ai": "machine learning",
-        "ml": "machine learning",
-        "deep learning": "deep learning",
-        "dl": "deep learning",
-        "quantum computing": "quantum computing",
-        "quantum algorithms": "quantum algorithms",
-        "circuit simulation": "circuit simulation",
-        "rest": "rest api",
-        "restful": "rest api",
-        "restful api": "rest api",
-        "continuous integration": "ci/cd",
-        "continuous deployment": "ci/cd",
-        "amazon web services": "aws",
-        "microsoft azure": "azure",
-        "google cloud": "gcp",
-        "google cloud platform": "gcp"
-    }
-    
-    return skill_mappings.get(skill, skill)
-
 # Invoke Amazon Bedrock model using provided payload and model parameters
 def invoke_bedrock(prompt_text):
     try:
@@ -178,15 +54,17 @@ def invoke_bedrock(prompt_text):
             "temperature": 0.3,  # Lower temperature for more consistent outputs
             "top_p": 0.9
         }
-        response = bedrock_client.invoke_model(
-            modelId="meta.llama3-8b-instruct-v1:0",
-            body=json.dumps(body),
-            contentType="application/json",
-            accept="application/json"
-        )
-        response_body = json.loads(response['body'].read())
+        with stage("skill-analysis", "bedrock"):
+            response = resources.bedrock_client().invoke_model(
+                modelId="meta.llama3-8b-instruct-v1:0",
+                body=json.dumps(body),
+                contentType="application/json",
+                accept="application/json"
+            )
+            response_body = json.loads(response['body'].read())
         return response_body.get("generation", "")
     except Exception as e:
+        count_error("skill-analysis", "bedrock")
         logger.error(f"Bedrock Error: {str(e)}")
         logger.error(f"Full Traceback: {traceback.format_exc()}")
         return ""
@@ -197,11 +75,12 @@ def extract_skills_from_resume(text):
     found_skills = set()
     
     # First, extract skills using predefined list
-    for skill in TECH_SKILLS:
-        # Use word boundaries for better matching
-        pattern = rf"\b{re.escape(skill)}\b"
-        if re.search(pattern, text, re.IGNORECASE):
-            found_skills.add(normalize_skill_name(skill))
+    with stage("skill-analysis", "regex_matching"):
+        for skill in TECH_SKILLS:
+            # Use word boundaries for better matching
+            pattern = rf"\b{re.escape(skill)}\b"
+            if re.search(pattern, text, re.IGNORECASE):
+                found_skills.add(normalize_skill_name(skill))
     
     # Use Bedrock to extract additional skills with improved prompt
     try:
@@ -240,7 +119,8 @@ Return format: skill1, skill2, skill3
     
     # Convert to list and remove empty strings
     final_skills = [skill for skill in found_skills if skill]
-    logger.info(f"Found Skills: {final_skills}")
+    logger.info(f"Found {len(final_skills)} skills")
+    logger.debug(f"Found Skills: {final_skills}")
     return final_skills
 
 # Identify skill gaps with enhanced normalization
@@ -261,12 +141,13 @@ def identify_skill_gaps(user_skills, job_skills):
         if normalized:
             job_skills_normalized.add(normalized)
     
-    logger.info(f"User Skills (Normalized): {user_skills_normalized}")
-    logger.info(f"Job Skills (Normalized): {job_skills_normalized}")
+    logger.debug(f"User Skills (Normalized): {user_skills_normalized}")
+    logger.debug(f"Job Skills (Normalized): {job_skills_normalized}")
     
     # Find gaps
     skill_gaps = list(job_skills_normalized - user_skills_normalized)
-    logger.info(f"Skill Gaps Identified: {skill_gaps}")
+    logger.info(f"Skill Gaps Identified: {len(skill_gaps)}")
+    logger.debug(f"Skill Gaps: {skill_gaps}")
     
     return skill_gaps
 
@@ -300,7 +181,7 @@ def calculate_readiness_score(user_skills, job_skills):
     else:
         match_score = 0
     
-    logger.info(f"Matching Skills: {matching_skills}")
+    logger.debug(f"Matching Skills: {matching_skills}")
     logger.info(f"Match Score: {match_score}")
     
     return round(match_score, 2)
@@ -329,7 +210,7 @@ Return ONLY a valid JSON array. Do not include any other text, explanations, or
     try:
         time.sleep(1)
         response_text = invoke_bedrock(prompt)
-        logger.info(f"Raw Bedrock Response (Courses): {response_text}")
+        logger.debug(f"Raw Bedrock Response (Courses): {response_text}")
         
         # Step 1: Clean the response by removing markdown blocks
         cleaned_text = response_text.strip()
@@ -353,7 +234,7 @@ Return ONLY a valid JSON array. Do not include any other text, explanations, or
         
         if start_bracket != -1 and end_bracket != -1 and end_bracket > start_bracket:
             json_text = cleaned_text[start_bracket:end_bracket + 1]
-            logger.info(f"Extracted JSON: {json_text}")
+            logger.debug(f"Extracted JSON: {json_text}")
             
             try:
                 courses = json.loads(json_text)
@@ -439,7 +320,7 @@ Do not use code blocks or JSON. Return plain text only.
     try:
         time.sleep(1)
         response_text = invoke_bedrock(prompt)
-        logger.info(f"Raw Bedrock Response (Plain Quiz): {response_text}")
+        logger.debug(f"Raw Bedrock Response (Plain Quiz): {response_text}")
 
         # Split questions
         pattern = r"Question:\s*(.*?)\nOptions:\s*(A\..*?)\nAnswer:\s*([A-D])\nSkill:\s*(.*?)\n?(?=Question:|$)"
@@ -467,7 +348,7 @@ Do not use code blocks or JSON. Return plain text only.
         return {"error": "Error generating quizzes", "raw": ""}
 
 # Enhanced main API endpoint
-@app.post("/analyze-skills/")
+@router.post("/analyze-skills/")
 async def analyze_skills(
     file: UploadFile = File(...),
     job_description: str = Form(...),
@@ -499,7 +380,7 @@ async def analyze_skills(
         
         # Extract skills from resume
         user_skills = extract_skills_from_resume(resume_text)
-        logger.info(f"Extracted User Skills: {user_skills}")
+        logger.debug(f"Extracted User Skills: {user_skills}")
         
         if not user_skills:
             raise HTTPException(
@@ -548,6 +429,21 @@ async def analyze_skills(
             detail=f"An unexpected error occurred during analysis: {str(e)}"
         )
 
+# Standalone service (uvicorn main:app); server.py mounts `router` instead
+app = FastAPI(default_response_class=MongoJSONResponse)
+
+# CORS Middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.include_router(router)
+instrument(app, "skill-analysis")
+profile_requests(app, "skill-analysis")
+
 @app.get("/")
 def read_root():
     """Health check endpoint"""
@@ -564,7 +460,7 @@ def health_check():
         "status": "healthy",
         "timestamp": now(),
         "services": {
-            "bedrock": "connected",
-            "spacy": "loaded"
+            # Created lazily on the first /analyze-skills/ call
+            "bedrock": "connected" if resources.status()["bedrock"] else "not initialized yet"
         }
     }
@@ -4,35 +4,102 @@ load_dotenv()
 import os
 import io
 import json
+import base64
+import hashlib
+import zlib
+import re
+import numpy as np
 import fitz
 import boto3
 import asyncio
 import tempfile
 import docx2txt
 
-from fastapi import FastAPI, Form, HTTPException, Query, status, Request, Path, BackgroundTasks
+from fastapi import APIRouter, FastAPI, Form, HTTPException, Query, status, Request, Path, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from datetime import datetime
 from urllib.parse import urlparse
-from pymongo import MongoClient
-from bson import ObjectId
+from bson import ObjectId, Binary
+from pymongo import UpdateOne
 from bson.errors import InvalidId
-from sentence_transformers import SentenceTransformer, util
 import requests
 import httpx
 
+import resources
+from instrumentation import instrument, stage, timed
+from profiling import profile_requests
+from serialization import MongoJSONResponse, dumps_lines
+from skills import compile_skill_matcher
+
 # === Utility ===
 def now():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def convert_object_ids(obj):
-    if isinstance(obj, list):
-        return [convert_object_ids(item) for item in obj]
-    elif isinstance(obj, dict):
-        return {k: (str(v) if isinstance(v, ObjectId) else convert_object_ids(v)) for k, v in obj.items()}
-    else:
-        return obj
+# === Listing / Pagination ===
+DEFAULT_PAGE_SIZE = int(os.getenv("PARTNER_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("PARTNER_MAX_PAGE_SIZE", "500"))
+EXPORT_BATCH_SIZE = 500
+
+# Shortlists are ranked by similarity; _id breaks ties so the order is total
+SHORTLIST_SORT = [("similarity_score", -1), ("_id", -1)]
+APPLICATIONS_SORT = [("_id", 1)]
+
+def encode_cursor(doc, sort):
+    values = [str(doc["_id"]) if key == "_id" else doc.get(key) for key, _ in sort]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+def cursor_filter(cursor, sort):
+    """Keyset filter matching the documents that sort after the cursor position."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        if len(values) != len(sort):
+            raise ValueError("cursor does not match sort order")
+        values = [ObjectId(v) if key == "_id" else v for (key, _), v in zip(sort, values)]
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    ors = []
+    for i, (key, direction) in enumerate(sort):
+        cond = {k: v for (k, _), v in zip(sort[:i], values[:i])}
+        cond[key] = {"$lt" if direction < 0 else "$gt": values[i]}
+        ors.append(cond)
+    return {"$or": ors}
+
+@timed("partner", "mongo_query")
+async def fetch_page(collection, query, projection, sort, limit, cursor=None):
+    if cursor:
+        query = {"$and": [query, cursor_filter(cursor, sort)]}
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1], sort) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+async def stream_jsonl(collection, query, projection, sort, cursor=None, drop_fields=(), resolve_text=False):
+    if cursor:
+        query = {"$and": [query, cursor_filter(cursor, sort)]}
+
+    async def lines():
+        batch = []
+        async for doc in collection.find(query, projection).sort(sort).batch_size(EXPORT_BATCH_SIZE):
+            for field in drop_fields:
+                doc.pop(field, None)
+            batch.append(doc)
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield await render_jsonl(batch, resolve_text)
+                batch = []
+        if batch:
+            yield await render_jsonl(batch, resolve_text)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def render_jsonl(docs, resolve_text):
+    if resolve_text:
+        await resolve_resume_texts(docs)
+    return dumps_lines(docs)
+
+def shortlist_projection(include_text):
+    return None if include_text else {"text": 0}
 
 def extract_school_admin_id(application):
     for key in ["schoolAdmin", "school_admin_id", "schoolAdminId"]:
@@ -44,18 +111,65 @@ def extract_school_admin_id(application):
     return None
 
 # === Setup ===
-print(f"[{now()}] Loading embedding model...")
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
-
-db = MongoClient(os.getenv("MONGO_URI")).get_default_database()
-print(f"[{now()}] Connected to MongoDB: {db.name}")
+# The embedding model and the pooled Motor client come from resources.py,
+# shared with the other services when they run in one process
+mongo_client = resources.motor_client(os.getenv("MONGO_URI"))
+db = mongo_client.get_default_database()
+print(f"[{now()}] Using MongoDB: {db.name} (maxPoolSize={resources.MONGO_MAX_POOL_SIZE})")
 shortlist_collection = db["shortlisted_candidates"]
 applications_collection = db["applications"]
-
-shortlist_collection.create_index([("internship_id", 1), ("school_admin_id", 1)])
-print(f"[{now()}] Created MongoDB indexes")
+resume_text_collection = db["resume_texts"]
+
+# === Resume Text Store ===
+# Extracted resume text lives once per distinct content, keyed by its sha256,
+# and shortlist records only carry the hash.
+RESUME_TEXT_COMPRESS = os.getenv("RESUME_TEXT_COMPRESS", "true").lower() in ("1", "true", "yes")
+RESUME_TEXT_COMPRESS_MIN_BYTES = int(os.getenv("RESUME_TEXT_COMPRESS_MIN_BYTES", "512"))
+
+def resume_text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def encode_resume_text(text):
+    raw = text.encode("utf-8")
+    if RESUME_TEXT_COMPRESS and len(raw) >= RESUME_TEXT_COMPRESS_MIN_BYTES:
+        return {"encoding": "zlib", "data": Binary(zlib.compress(raw, 6)), "size": len(raw)}
+    return {"encoding": "utf-8", "data": text, "size": len(raw)}
+
+def decode_resume_text(doc):
+    if doc.get("encoding") == "zlib":
+        return zlib.decompress(doc["data"]).decode("utf-8")
+    return doc.get("data", "")
+
+async def store_resume_texts(by_hash):
+    """Upserts {hash: text}; texts already in the store are left untouched."""
+    if not by_hash:
+        return
+    ops = [
+        UpdateOne(
+            {"_id": h},
+            {"$setOnInsert": {**encode_resume_text(t), "createdAt": datetime.utcnow()}},
+            upsert=True
+        )
+        for h, t in by_hash.items()
+    ]
+    with stage("partner", "mongo_query"):
+        await resume_text_collection.bulk_write(ops, ordered=False)
+
+async def resolve_resume_texts(docs):
+    """Attaches `text` to shortlist docs that reference the store by text_hash."""
+    hashes = list({d["text_hash"] for d in docs if d.get("text_hash") and "text" not in d})
+    if not hashes:
+        return docs
+    with stage("partner", "mongo_query"):
+        stored = await resume_text_collection.find({"_id": {"$in": hashes}}).to_list(length=None)
+    texts = {t["_id"]: decode_resume_text(t) for t in stored}
+    for d in docs:
+        if "text" not in d and d.get("text_hash") in texts:
+            d["text"] = texts[d["text_hash"]]
+    return docs
 
 # === Resume Utilities ===
+@timed("partner", "resume_download")
 def download_resume_from_s3(resume_url: str):
     print(f"[{now()}] Downloading resume from: {resume_url}")
     try:
@@ -76,6 +190,7 @@ def download_resume_from_s3(resume_url: str):
         print(f"[{now()}] S3 Download Error: {e}")
         return None
 
+@timed("partner", "text_extraction")
 def extract_text_from_pdf(pdf_file):
     try:
         pdf_file.seek(0)
@@ -88,6 +203,7 @@ def extract_text_from_pdf(pdf_file):
         print(f"[{now()}] PDF Extract Error: {e}")
         return ""
 
+@timed("partner", "text_extraction")
 def extract_text_from_docx(docx_file):
     try:
         docx_file.seek(0)
@@ -102,10 +218,9 @@ def extract_text_from_docx(docx_file):
         return ""
 
 # === Core Resume Processing ===
-async def process_resume(resume_url, job_embedding):
-    application = await asyncio.get_event_loop().run_in_executor(
-        None, lambda: applications_collection.find_one({"resumeUrl": resume_url})
-    )
+async def process_resume(resume_url):
+    with stage("partner", "mongo_query"):
+        application = await applications_collection.find_one({"resumeUrl": resume_url})
 
     if not application:
         print(f"[{now()}] No application found for resume: {resume_url}")
@@ -135,33 +250,119 @@ async def process_resume(resume_url, job_embedding):
         print(f"[{now()}] Unsupported file type: {ext}")
         return None
 
-    embedding = embedder.encode(text, convert_to_tensor=True)
-    similarity = util.cos_sim(embedding, job_embedding).item()
-    print(f"[{now()}] Similarity score for {email}: {similarity:.4f}")
-
     return {
         "student_id": student_id,
         "name": name,
         "email": email,
         "appliedDate": applied_date,
         "resumeUrl": resume_url,
-        "similarity_score": similarity,
         "text": text,
         "school_admin_id": school_admin_id
     }
 
+# === Ranking ===
+SHORTLIST_THRESHOLD = float(os.getenv("SHORTLIST_THRESHOLD", "0.3"))
+# all-MiniLM-L6-v2 truncates at 256 word pieces; keep chunks comfortably below
+RANK_CHUNK_WORDS = int(os.getenv("RANK_CHUNK_WORDS", "150"))
+RANK_MAX_CHUNKS = int(os.getenv("RANK_MAX_CHUNKS", "24"))
+RANK_ENCODE_BATCH_SIZE = int(os.getenv("RANK_ENCODE_BATCH_SIZE", "64"))
+# semantic = w * max(chunk sim) + (1 - w) * mean(chunk sim)
+RANK_MAX_SIM_WEIGHT = float(os.getenv("RANK_MAX_SIM_WEIGHT", "0.7"))
+# score = (1 - w) * semantic + w * skill match (only when the job lists skills)
+RANK_SKILL_WEIGHT = float(os.getenv("RANK_SKILL_WEIGHT", "0.35"))
+
+SECTION_SPLIT = re.compile(r"\n\s*\n")
+
+def chunk_resume(text):
+    """Splits resume text into section-aligned chunks of at most RANK_CHUNK_WORDS words."""
+    chunks = []
+    current = []
+    for section in SECTION_SPLIT.split(text or ""):
+        words = section.split()
+        if not words:
+            continue
+        if current and len(current) + len(words) > RANK_CHUNK_WORDS:
+            chunks.append(" ".join(current))
+            current = []
+        while len(words) > RANK_CHUNK_WORDS:
+            chunks.append(" ".join(words[:RANK_CHUNK_WORDS]))
+            words = words[RANK_CHUNK_WORDS:]
+        current.extend(words)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks[:RANK_MAX_CHUNKS]
+
+@timed("partner", "embedding_encode")
+def encode_normalized(texts):
+    return resources.embedder().encode(
+        texts,
+        batch_size=RANK_ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+
+@timed("partner", "scoring")
+def rank_candidates(candidates, job_description, job_skills):
+    """
+    Scores every candidate against the job in one pass: chunk similarities
+    come from a single batched encode and one matrix product, and skill
+    matches from one compiled regex per resume. Adds similarity_score,
+    semantic_score, skill_score and matched_skills to each candidate.
+    """
+    if not candidates:
+        return candidates
+
+    job_vec = encode_normalized([job_description + " " + " ".join(job_skills)])[0]
+
+    chunk_lists = [chunk_resume(c["text"]) for c in candidates]
+    counts = np.array([len(ch) for ch in chunk_lists])
+    all_chunks = [chunk for ch in chunk_lists for chunk in ch]
+
+    semantic = np.zeros(len(candidates))
+    if all_chunks:
+        chunk_sims = encode_normalized(all_chunks) @ job_vec
+        has_chunks = counts > 0
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))[has_chunks]
+        max_sim = np.maximum.reduceat(chunk_sims, offsets)
+        mean_sim = np.add.reduceat(chunk_sims, offsets) / counts[has_chunks]
+        semantic[has_chunks] = RANK_MAX_SIM_WEIGHT * max_sim + (1 - RANK_MAX_SIM_WEIGHT) * mean_sim
+
+    pattern, skills = compile_skill_matcher(job_skills)
+    if pattern is not None:
+        hits = np.zeros((len(candidates), len(skills)), dtype=np.float32)
+        with stage("partner", "regex_matching"):
+            for row, cand in enumerate(candidates):
+                for m in pattern.finditer(cand["text"] or ""):
+                    hits[row, int(m.lastgroup[1:])] = 1.0
+        skill_score = hits.mean(axis=1)
+        scores = (1 - RANK_SKILL_WEIGHT) * semantic + RANK_SKILL_WEIGHT * skill_score
+    else:
+        hits = np.zeros((len(candidates), 0), dtype=np.float32)
+        skill_score = np.zeros(len(candidates))
+        scores = semantic
+
+    for row, cand in enumerate(candidates):
+        cand["similarity_score"] = float(scores[row])
+        cand["semantic_score"] = float(semantic[row])
+        cand["skill_score"] = float(skill_score[row])
+        cand["matched_skills"] = [skills[i] for i in np.flatnonzero(hits[row])]
+        print(f"[{now()}] Similarity score for {cand['email']}: {cand['similarity_score']:.4f}")
+    return candidates
+
 # === FastAPI App Init ===
-app = FastAPI()
+router = APIRouter(default_response_class=MongoJSONResponse)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@router.on_event("startup")
+async def create_indexes():
+    # Serve the ranked listings straight from the index, no in-memory sort
+    await shortlist_collection.create_index(
+        [("internship_id", 1), ("similarity_score", -1), ("_id", -1)]
+    )
+    await shortlist_collection.create_index(
+        [("internship_id", 1), ("school_admin_id", 1), ("similarity_score", -1), ("_id", -1)]
+    )
+    print(f"[{now()}] Created MongoDB indexes")
 
-@app.middleware("http")
 async def log_requests(request: Request, call_next):
     print(f"\n[{now()}] 🔄 Incoming request: {request.method} {request.url}")
     response = await call_next(request)
@@ -169,59 +370,184 @@ async def log_requests(request: Request, call_next):
     return response
 
 
-# --- Helper function ---
-async def notify_rejection(app_doc):
+# === Rejection Notifications ===
+NODE_API_BASE_URL = os.getenv("NODE_API_BASE_URL", "http://localhost:5000")
+FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:3000")
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "20"))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "3"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "0.5"))
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+# Bulk mode posts notifications in batches to /api/notifications/bulk
+NOTIFY_BULK = os.getenv("NOTIFY_BULK", "true").lower() in ("1", "true", "yes")
+# The per-application PUT is what makes Node send the recommendations email;
+# the status itself is already written by update_many in shortlist_candidates.
+NOTIFY_STATUS_PUT = os.getenv("NOTIFY_STATUS_PUT", "true").lower() in ("1", "true", "yes")
+
+# Idempotent requests (the status PUT) are retried on any transport error
+# and on these statuses
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Node doesn't dedupe notification POSTs, so those are only retried when the
+# request can't have been processed: it never reached Node, or was turned away
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+UNPROCESSED_STATUS = {429, 503}
+
+def rejection_payload(app_doc):
     student_id = str(app_doc.get("studentId"))
     job_title = app_doc.get("jobTitle", "the internship")
     student_email = app_doc.get("userEmail") or app_doc.get("studentEmail")
 
     if not student_email:
-     print(f"[{now()}] ⚠️ No email found for studentId: {student_id}")
-     return
+        print(f"[{now()}] ⚠️ No email found for studentId: {student_id}")
+        return None
 
-    async with httpx.AsyncClient(timeout=10) as client:
+    # Create only in-app notification; skip generic email
+    return {
+        "studentId": student_id,
+        "email": student_email,
+        "title": "Application Rejected",
+        "message": (
+            f"Unfortunately, your application for {job_title} was rejected. "
+            f"But don’t worry—we recommend exploring new opportunities."
+        ),
+        "link": f"{FRONTEND_BASE_URL}/user-main-page?openTab=recommendations",
+        "skipEmail": True
+    }
+
+class NotificationDispatcher:
+    """
+    Sends rejection status updates and in-app notifications to the Node API
+    over one long-lived pooled client, with bounded concurrency and retries.
+    """
+
+    def __init__(self, base_url, concurrency, max_retries, backoff_seconds, batch_size):
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.backoff_seconds = backoff_seconds
+        self.batch_size = max(1, batch_size)
+        self._client = None
+        self._semaphore = None
+
+    def _get_client(self):
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=10,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def close(self):
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
+    async def _request(self, method, path, payload):
+        """
+        Sends one request, retrying with exponential backoff. A POST (not
+        idempotent) is only retried if it can't have reached Node. Raises
+        the last transport error, or HTTPStatusError with the last response
+        if every attempt got a retryable status.
+        """
+        client = self._get_client()
+        idempotent = method != "POST"
+        retry_errors = httpx.TransportError if idempotent else UNSENT_ERRORS
+        retry_status = RETRYABLE_STATUS if idempotent else UNPROCESSED_STATUS
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    resp = await client.request(method, path, json=payload)
+            except retry_errors as e:
+                if attempt == self.max_retries:
+                    raise
+                error = str(e) or e.__class__.__name__
+            else:
+                if resp.status_code not in retry_status:
+                    return resp
+                if attempt == self.max_retries:
+                    raise httpx.HTTPStatusError(
+                        f"{method} {path} returned {resp.status_code} after {attempt + 1} attempts",
+                        request=resp.request, response=resp)
+                error = f"status {resp.status_code}"
+            delay = self.backoff_seconds * (2 ** attempt)
+            print(f"[{now()}] 🔁 {method} {path} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def update_status(self, app_doc):
         try:
             # Update status (Node will send rich recommendations email)
-            await client.put(
-                f"http://localhost:5000/api/applications/{app_doc['_id']}/status",
-                json={"status": "Rejected"}
-            )
-
-            # Create only in-app notification; skip generic email
-            notif_payload = {
-                "studentId": student_id,
-                "email": student_email,
-                "title": "Application Rejected",
-                "message": (
-                    f"Unfortunately, your application for {job_title} was rejected. "
-                    f"But don’t worry—we recommend exploring new opportunities."
-                ),
-                "link": "http://localhost:3000/user-main-page?openTab=recommendations",
-                "skipEmail": True
-            }
-
-            print(f"[{now()}] Posting notification with skipEmail=True → {notif_payload}")
-
-            resp = await client.post(
-                "http://localhost:5000/api/notifications",
-                json=notif_payload
+            resp = await self._request(
+                "PUT", f"/api/applications/{app_doc['_id']}/status", {"status": "Rejected"}
             )
+            if resp.status_code >= 400:
+                print(f"[{now()}] ❌ Status update returned {resp.status_code} for application {app_doc['_id']}")
+        except Exception as e:
+            print(f"[{now()}] ❌ Status update failed for application {app_doc['_id']}: {e}")
 
+    async def notify(self, payload):
+        try:
+            resp = await self._request("POST", "/api/notifications", payload)
             if resp.status_code in (200, 201):
-                print(f"[{now()}] ✅ In-app notification created for student {student_id} ({student_email})")
+                print(f"[{now()}] ✅ In-app notification created for student {payload['studentId']} ({payload['email']})")
             else:
-                print(f"[{now()}] ❌ Node API returned {resp.status_code} for student {student_id}: {resp.text}")
+                print(f"[{now()}] ❌ Node API returned {resp.status_code} for student {payload['studentId']}: {resp.text}")
+        except Exception as e:
+            print(f"[{now()}] ❌ Failed notification/email trigger for {payload['studentId']}: {e}")
 
+    async def notify_batch(self, payloads):
+        try:
+            resp = await self._request("POST", "/api/notifications/bulk", {"notifications": payloads})
         except Exception as e:
-            print(f"[{now()}] ❌ Failed notification/email trigger for {student_id}: {e}")
+            print(f"[{now()}] ❌ Bulk notification request failed ({len(payloads)} students): {e}")
+            return
+        if resp.status_code == 404:
+            # Older Node API without the bulk route: fall back to one POST each
+            await asyncio.gather(*(self.notify(p) for p in payloads))
+        elif resp.status_code in (200, 201):
+            print(f"[{now()}] ✅ Bulk in-app notifications created for {len(payloads)} students")
+        else:
+            print(f"[{now()}] ❌ Node API returned {resp.status_code} for bulk notifications: {resp.text}")
+
+    async def notify_rejections(self, app_docs, bulk=NOTIFY_BULK, update_status=NOTIFY_STATUS_PUT):
+        started = datetime.now()
+        payloads = [p for p in (rejection_payload(d) for d in app_docs) if p]
+
+        if update_status:
+            await asyncio.gather(*(self.update_status(d) for d in app_docs))
+
+        if bulk:
+            batches = [payloads[i:i + self.batch_size] for i in range(0, len(payloads), self.batch_size)]
+            await asyncio.gather(*(self.notify_batch(b) for b in batches))
+        else:
+            await asyncio.gather(*(self.notify(p) for p in payloads))
+
+        elapsed = (datetime.now() - started).total_seconds()
+        print(f"[{now()}] 📨 Rejection notifications dispatched for {len(payloads)} applicants in {elapsed:.2f}s")
+
+notifier = NotificationDispatcher(
+    NODE_API_BASE_URL,
+    concurrency=NOTIFY_CONCURRENCY,
+    max_retries=NOTIFY_MAX_RETRIES,
+    backoff_seconds=NOTIFY_BACKOFF_SECONDS,
+    batch_size=NOTIFY_BATCH_SIZE
+)
 
+@router.on_event("shutdown")
+async def close_notifier():
+    await notifier.close()
 
-@app.post("/partner/shortlist")
+
+@router.post("/partner/shortlist")
 async def shortlist_candidates(
     internship_id: str = Form(...),
     job_description: str = Form(...),
     job_skills: str = Form(...),
     resumes: list[str] = Form(...),
+    threshold: Optional[float] = Form(None, ge=0, le=1),
     background_tasks: BackgroundTasks = None
 ):
     # Validate internship_id
@@ -239,16 +565,23 @@ async def shortlist_candidates(
     if not resumes:
         raise HTTPException(status_code=400, detail="No resumes provided.")
 
-    # Compose job text and get embedding
-    job_text = job_description + " " + " ".join(job_skills_list)
-    job_embedding = embedder.encode(job_text, convert_to_tensor=True)
+    if not isinstance(job_skills_list, list):
+        job_skills_list = []
+    job_skills_list = [str(s) for s in job_skills_list if s]
 
-    # Async process each resume and compute similarity
-    tasks = [process_resume(url, job_embedding) for url in resumes]
+    # Async download and extract each resume
+    tasks = [process_resume(url) for url in resumes]
     results = await asyncio.gather(*tasks)
 
-    # Filter candidates by similarity threshold
-    candidates = [c for c in results if c and c['similarity_score'] >= 0.3]
+    # Rank the whole pool at once, off the event loop
+    loaded = [c for c in results if c]
+    await asyncio.get_event_loop().run_in_executor(
+        None, rank_candidates, loaded, job_description, job_skills_list
+    )
+
+    # Filter candidates by the internship's threshold
+    min_score = SHORTLIST_THRESHOLD if threshold is None else threshold
+    candidates = [c for c in loaded if c['similarity_score'] >= min_score]
 
     # Attach normalized IDs and validate school_admin_id
     for cand in candidates:
@@ -260,38 +593,52 @@ async def shortlist_candidates(
     candidates = sorted(candidates, key=lambda x: x['similarity_score'], reverse=True)
 
     if candidates:
-        # Insert shortlisted candidates into MongoDB collection
-        shortlist_collection.insert_many(candidates)
+        # Store resume text out of line, then insert the slim shortlist records
+        texts = {}
+        for cand in candidates:
+            text = cand.pop('text', None)
+            if text is not None:
+                cand['text_hash'] = resume_text_hash(text)
+                texts[cand['text_hash']] = text
+        await store_resume_texts(texts)
+        with stage("partner", "mongo_query"):
+            await shortlist_collection.insert_many(candidates)
 
         shortlisted_resume_urls = [c['resumeUrl'] for c in candidates]
-        all_applications = list(applications_collection.find({"internshipId": internship_obj_id}))
+        with stage("partner", "mongo_query"):
+            all_applications = await applications_collection.find({"internshipId": internship_obj_id}).to_list(length=None)
         all_resume_urls = [app['resumeUrl'] for app in all_applications]
 
         # Identify rejected resumes as those applied but not shortlisted
         rejected_resume_urls = list(set(all_resume_urls) - set(shortlisted_resume_urls))
 
         # Update statuses in application collection
-        applications_collection.update_many(
-            {"resumeUrl": {"$in": shortlisted_resume_urls}},
-            {"$set": {"status": "Shortlisted"}}
-        )
-        applications_collection.update_many(
-            {"resumeUrl": {"$in": rejected_resume_urls}},
-            {"$set": {"status": "Rejected"}}
-        )
+        with stage("partner", "mongo_query"):
+            await applications_collection.update_many(
+                {"resumeUrl": {"$in": shortlisted_resume_urls}},
+                {"$set": {"status": "Shortlisted"}}
+            )
+            await applications_collection.update_many(
+                {"resumeUrl": {"$in": rejected_resume_urls}},
+                {"$set": {"status": "Rejected"}}
+            )
 
-        # Trigger rejection notifications asynchronously
-        for resume_url in rejected_resume_urls:
-            app_doc = applications_collection.find_one({"resumeUrl": resume_url})
-            if app_doc:
-                background_tasks.add_task(notify_rejection, app_doc)
+        # Trigger rejection notifications asynchronously, in one dispatch
+        rejected = set(rejected_resume_urls)
+        rejected_apps = [app for app in all_applications if app.get('resumeUrl') in rejected]
+        if rejected_apps:
+            background_tasks.add_task(notifier.notify_rejections, rejected_apps)
 
-    return {"shortlisted_candidates": convert_object_ids(candidates)}
+    return MongoJSONResponse({"shortlisted_candidates": candidates})
 
-@app.get("/partner/shortlisted/by-admin")
+@router.get("/partner/shortlisted/by-admin")
 async def get_shortlisted_by_admin(
     internship_id: str = Query(...),
-    school_admin_id: str = Query(...)
+    school_admin_id: str = Query(...),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    include_text: bool = Query(False),
+    format: str = Query("json", pattern="^(json|jsonl)$")
 ):
     print(f"\n[{now()}] === /partner/shortlisted/by-admin Called ===")
     print(f"[{now()}] Raw Query Params → internship_id: '{internship_id}', school_admin_id: '{school_admin_id}'")
@@ -307,31 +654,92 @@ async def get_shortlisted_by_admin(
         "school_admin_id": ObjectId(school_admin_id)
     }
 
+    projection = shortlist_projection(include_text)
+    if format == "jsonl":
+        return await stream_jsonl(shortlist_collection, query, projection, SHORTLIST_SORT, cursor,
+                                  resolve_text=include_text)
+
     try:
-        docs = list(shortlist_collection.find(query))
-        return {"shortlisted_candidates": convert_object_ids(docs)}
+        docs, next_cursor = await fetch_page(shortlist_collection, query, projection, SHORTLIST_SORT, limit, cursor)
+        if include_text:
+            await resolve_resume_texts(docs)
+        return MongoJSONResponse({"shortlisted_candidates": docs, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="Database error occurred.")
 
-@app.get("/partner/shortlisted/{internship_id}")
+@router.get("/partner/shortlisted/{internship_id}")
 async def get_shortlisted_candidates(
-    internship_id: str = Path(..., pattern="^[a-fA-F0-9]{24}$")
+    internship_id: str = Path(..., pattern="^[a-fA-F0-9]{24}$"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    include_text: bool = Query(False),
+    format: str = Query("json", pattern="^(json|jsonl)$")
 ):
     try:
         internship_obj_id = ObjectId(internship_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid internship_id: {e}")
 
+    query = {"internship_id": internship_obj_id}
+    projection = shortlist_projection(include_text)
+    if format == "jsonl":
+        return await stream_jsonl(shortlist_collection, query, projection, SHORTLIST_SORT, cursor,
+                                  resolve_text=include_text)
+
     try:
-        docs = list(shortlist_collection.find({"internship_id": internship_obj_id}))
-        return {"shortlisted_candidates": convert_object_ids(docs)}
+        docs, next_cursor = await fetch_page(shortlist_collection, query, projection, SHORTLIST_SORT, limit, cursor)
+        if include_text:
+            await resolve_resume_texts(docs)
+        return MongoJSONResponse({"shortlisted_candidates": docs, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/partner/fetch-applications/{job_id}")
-async def fetch_applications(job_id: str):
+@router.get("/partner/fetch-applications/{job_id}")
+async def fetch_applications(
+    job_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
+    format: str = Query("json", pattern="^(json|jsonl)$")
+):
+    query = {"job_id": job_id}
+    if format == "jsonl":
+        return await stream_jsonl(applications_collection, query, None, APPLICATIONS_SORT, cursor, drop_fields=("_id",))
+
     try:
-        apps = list(applications_collection.find({"job_id": job_id}, {"_id": 0}))
-        return {"applications": convert_object_ids(apps)}
+        # _id is read for the cursor only; the response still omits it
+        apps, next_cursor = await fetch_page(applications_collection, query, None, APPLICATIONS_SORT, limit, cursor)
+        for app_doc in apps:
+            app_doc.pop("_id", None)
+        return MongoJSONResponse({"applications": apps, "next_cursor": next_cursor})
+    except HTTPException:
+        raise
     except Exception as e:
         return {"error": str(e)}
+
+# === Standalone service (uvicorn partner:app); server.py mounts `router` instead ===
+app = FastAPI(default_response_class=MongoJSONResponse)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+app.middleware("http")(log_requests)
+app.include_router(router)
+instrument(app, "partner")
+profile_requests(app, "partner")
+
+@app.on_event("startup")
+def load_embedder():
+    # Load the model at boot rather than on the first request
+    resources.embedder()
+
+@app.on_event("shutdown")
+async def close_mongo():
+    resources.close_motor_clients()
@@ -0,0 +1,297 @@
+"""
+On-demand profiling of single requests, shared by the ai-backend services.
+
+Off unless configured. With neither AI_BACKEND_PROFILE_TOKEN nor a sample
+rate set, profile_requests() adds no middleware at all; when it is on,
+requests that aren't profiled only pay for a header lookup.
+
+A request is profiled when it carries
+
+    X-Profile-Token: <AI_BACKEND_PROFILE_TOKEN>
+    X-Profile: sample | cprofile        (or 1 for AI_BACKEND_PROFILE_MODE)
+
+or when it is picked by AI_BACKEND_PROFILE_SAMPLE_RATE (0..1). The response
+gets an X-Profile-Id header, and the profile is written to
+AI_BACKEND_PROFILE_DIR, keeping the newest AI_BACKEND_PROFILE_MAX_FILES:
+
+    sample    wall-clock stacks of every thread every
+              AI_BACKEND_PROFILE_INTERVAL_MS, as speedscope JSON
+              (https://www.speedscope.app). Includes the run_in_executor
+              work (embedding, scoring, text extraction).
+    cprofile  cProfile of the event-loop thread, as .pstats
+              (python -m pstats, snakeviz). Exact call counts, but work
+              handed to the thread pool shows up as waiting.
+
+Either way it is a picture of the whole process while the request ran, so
+requests served concurrently on the same worker appear too. One profile
+runs at a time per process; a request arriving while one is running is
+served unprofiled.
+
+GET /admin/profiles lists the stored profiles and
+GET /admin/profiles/{name} downloads one (name or X-Profile-Id); both
+need the X-Profile-Token header.
+"""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson  # type: ignore
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.responses import FileResponse
+
+PROFILE_TOKEN = os.getenv("AI_BACKEND_PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("AI_BACKEND_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("AI_BACKEND_PROFILE_MODE", "sample")
+PROFILE_DIR = os.getenv("AI_BACKEND_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "ai-backend-profiles"))
+PROFILE_MAX_FILES = int(os.getenv("AI_BACKEND_PROFILE_MAX_FILES", "50"))
+PROFILE_INTERVAL = float(os.getenv("AI_BACKEND_PROFILE_INTERVAL_MS", "5")) / 1000
+
+MODES = ("sample", "cprofile")
+EXTENSIONS = {"sample": ".speedscope.json", "cprofile": ".pstats"}
+# Never sampled: scrapes and the admin endpoints themselves
+SKIP_PATHS = ("/metrics", "/admin/profiles")
+NAME_RE = re.compile(r"^[\w.-]+$")
+
+# Leaf frames of a thread with nothing to do; samples ending in one are dropped
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("runners.py", "run"),
+}
+
+_busy = threading.Lock()
+_counter = itertools.count(1)
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def requested_mode(scope: Dict[str, Any]) -> Optional[str]:
+    """The profiling mode for this request, or None to serve it normally."""
+    value = _header(scope, b"x-profile")
+    if value is not None and _authorized(_header(scope, b"x-profile-token")):
+        value = value.strip().lower()
+        return value if value in MODES else PROFILE_MODE
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        if not scope["path"].startswith(SKIP_PATHS):
+            return PROFILE_MODE
+    return None
+
+
+class StackSampler:
+    """Samples the Python stack of every other thread on a timer."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.frames: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self.names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self.frames.get(key)
+        if index is None:
+            index = self.frames[key] = len(self.frames)
+        return index
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = (now - last) * 1000, now
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(ident, []).append((stack, elapsed))
+            if len(self.names) < len(self.samples):
+                self.names.update((t.ident, t.name) for t in threading.enumerate())
+
+    def speedscope(self, name: str) -> bytes:
+        profiles = []
+        for ident, samples in self.samples.items():
+            total = sum(weight for _, weight in samples)
+            profiles.append({
+                "type": "sampled",
+                "name": self.names.get(ident, str(ident)),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": total,
+                "samples": [stack for stack, _ in samples],
+                "weights": [weight for _, weight in samples],
+            })
+        # Busiest thread first; speedscope opens profiles[0]
+        profiles.sort(key=lambda p: -p["endValue"])
+        frames = [{"name": fn, "file": file, "line": line} for fn, file, line in self.frames]
+        return orjson.dumps({
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ai-backend profiling.py",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        })
+
+
+def rotate(directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_FILES) -> None:
+    """Delete all but the newest `keep` profiles."""
+    try:
+        entries = [e for e in os.scandir(directory) if e.name.endswith(tuple(EXTENSIONS.values()))]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # Another worker got there first
+
+
+def _save(name: str, mode: str, profile: Any) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, name)
+    if mode == "cprofile":
+        profile.dump_stats(path)
+    else:
+        with open(path, "wb") as f:
+            f.write(profile.speedscope(name))
+    rotate()
+
+
+def find_profile(name: str) -> Optional[str]:
+    """Path of a stored profile by file name or by its X-Profile-Id prefix."""
+    if not NAME_RE.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    if os.path.isfile(path):
+        return path
+    try:
+        matches = [e.path for e in os.scandir(PROFILE_DIR) if e.name.startswith(name + "-")]
+    except FileNotFoundError:
+        return None
+    return matches[0] if len(matches) == 1 else None
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR) if e.name.endswith(tuple(EXTENSIONS.values()))]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [{
+        "name": e.name,
+        "bytes": e.stat().st_size,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(e.stat().st_mtime)),
+    } for e in entries]
+
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware, so unprofiled requests skip the BaseHTTPMiddleware machinery."""
+
+    def __init__(self, app, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        mode = requested_mode(scope)
+        if mode is None or not _busy.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{next(_counter)}"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", ())) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        try:
+            if mode == "cprofile":
+                profile = cProfile.Profile()
+                profile.enable()
+            else:
+                profile = StackSampler()
+                profile.start()
+        except ValueError:
+            # Another profiler (a debugger, coverage) already owns this thread
+            _busy.release()
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            if mode == "cprofile":
+                profile.disable()
+            else:
+                profile.stop()
+            _busy.release()
+            elapsed = time.perf_counter() - start
+            route = getattr(scope.get("route"), "path", scope["path"])
+            slug = re.sub(r"\W+", "_", route).strip("_") or "root"
+            name = f"{profile_id}-{self.service}-{scope['method']}-{slug}{EXTENSIONS[mode]}"
+            print(f"[profiling] {scope['method']} {scope['path']} took {elapsed:.3f}s, profile {name}")
+            await asyncio.get_event_loop().run_in_executor(None, _save, name, mode, profile)
+
+
+def profile_requests(app: FastAPI, name: str) -> None:
+    """Profiling middleware (only if configured) plus the /admin/profiles endpoints."""
+    if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(ProfilingMiddleware, service=name)
+
+    def check_token(token: Optional[str]) -> None:
+        if not _authorized(token):
+            # Same answer whether profiling is off or the token is wrong
+            raise HTTPException(status_code=404, detail="Not Found")
+
+    @app.get("/admin/profiles", include_in_schema=False)
+    def profiles(x_profile_token: Optional[str] = Header(None)):
+        check_token(x_profile_token)
+        return {"directory": PROFILE_DIR, "max_files": PROFILE_MAX_FILES, "profiles": list_profiles()}
+
+    @app.get("/admin/profiles/{profile_name}", include_in_schema=False)
+    def download_profile(profile_name: str, x_profile_token: Optional[str] = Header(None)):
+        check_token(x_profile_token)
+        path = find_profile(profile_name)
+        if path is None:
+            raise HTTPException(status_code=404, detail="profile not found")
+        media_type = "application/json" if path.endswith(".json") else "application/octet-stream"
+        return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
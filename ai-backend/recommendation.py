@@ -1,17 +1,31 @@
 import os
+import re
+import asyncio
+import hashlib
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import numpy as np
 import orjson # type: ignore
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import ORJSONResponse
-from motor.motor_asyncio import AsyncIOMotorClient # type: ignore
+from fastapi import APIRouter, FastAPI, HTTPException, BackgroundTasks, Header
+from fastapi.responses import Response
 from bson import ObjectId
-from sentence_transformers import SentenceTransformer, util
-from typing import List, Dict, Any, Union
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
+
+import resources
+from instrumentation import cache_result, instrument, stage, timed
+from profiling import profile_requests
+from serialization import MongoJSONResponse, dumps
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI()
+router = APIRouter(default_response_class=MongoJSONResponse)
 
 # MongoDB setup
 MONGO_URI = os.getenv("MONGO_URI", "")
@@ -20,16 +34,42 @@ DB_NAME = os.getenv("MONGO_DB_NAME", "skillnaav")
 if not MONGO_URI:
     raise ValueError("MONGO_URI environment variable is not set. Cannot connect to the database.")
 
-client = AsyncIOMotorClient(MONGO_URI)
+client = resources.motor_client(MONGO_URI)
 db = client[DB_NAME]
 
 application_collection = db.applications
 user_collection = db.userwebapps
 internship_collection = db.internshippostings
 personality_collection = db.personalityresponses # or whatever your personality results collection is
+results_collection = db.recommendation_results # precomputed top-N per student, keyed by student _id
+batch_runs_collection = db.recommendation_batch_runs # run history + the scheduler lease
+
+# Batch recommendations
+RECOMMENDATION_TOP_N = int(os.getenv("RECOMMENDATION_TOP_N", "20"))  # stored per student
+RECOMMENDATION_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATION_MAX_AGE_HOURS", "26"))
+RECOMMENDATION_BATCH_CHUNK = int(os.getenv("RECOMMENDATION_BATCH_CHUNK", "256"))  # students per scoring pass
+RECOMMENDATION_BATCH_SCHEDULE = os.getenv("RECOMMENDATION_BATCH_SCHEDULE", "1") == "1"
+RECOMMENDATION_BATCH_HOUR = int(os.getenv("RECOMMENDATION_BATCH_HOUR", "2"))  # UTC
+RECOMMENDATION_BATCH_LEASE_SECONDS = int(os.getenv("RECOMMENDATION_BATCH_LEASE_SECONDS", "3600"))
+POSTING_MATRIX_TTL = float(os.getenv("POSTING_MATRIX_TTL", "600"))  # seconds the encoded open postings are reused
+RECOMMENDATION_COHORT_MAX = int(os.getenv("RECOMMENDATION_COHORT_MAX", "500"))  # students per cohort request
+
+# Result cache + invalidation
+RECOMMENDATION_CACHE_TTL = float(os.getenv("RECOMMENDATION_CACHE_TTL", "900"))  # seconds; bounds staleness if an event is missed
+RECOMMENDATION_CACHE_MAX = int(os.getenv("RECOMMENDATION_CACHE_MAX", "10000"))
+RECOMMENDATION_CACHE_WATCH = os.getenv("RECOMMENDATION_CACHE_WATCH", "auto")  # auto | change_stream | poll | memory | off
+RECOMMENDATION_CACHE_POLL_SECONDS = float(os.getenv("RECOMMENDATION_CACHE_POLL_SECONDS", "30"))
+ENCODE_BATCH_SIZE = int(os.getenv("RECOMMENDATION_ENCODE_BATCH_SIZE", "64"))
+ACTIVE_STUDENT_QUERY = {"isActive": True}
+FIELD_SIM_THRESHOLD = 0.6
+CANDIDATE_LIMIT = 100  # on-demand path
 
-# Initialize Sentence-Transformer model
-embedder = SentenceTransformer('all-MiniLM-L6-v2')
+# Only the profile fields derive_signals / scoring read
+STUDENT_PROJECTION = {
+    "skills": 1, "desiredRole": 1, "interests": 1, "preferredLocations": 1,
+    "city": 1, "fieldOfStudy": 1, "desiredField": 1,
+}
+INFERENCE_PROJECTION = {"qualifications": 1, "jobTitle": 1, "sector": 1, "location": 1, "classification": 1}
 
 # Level ranking for career progression logic
 LEVEL_RANK = {'basic': 1, 'intermediate': 2, 'advanced': 3}
@@ -44,18 +84,64 @@ RIASEC_SECTOR_MAP = {
     "C": ["accounting", "finance", "administration", "data entry", "project management"],
 }
 
-# --- Helper Functions ---
+# --- Sector taxonomy ---
+# Postings carry free-text sectors ("Data Science & Analytics", "Graphic
+# Designing"), so the map above rarely matches them verbatim. Every term in
+# it becomes a canonical sector id; a posting's sector is reduced to the ids
+# whose terms occur in it as whole words (longest term wins where two
+# overlap, so "data entry" isn't also "data").
 
-def convert_object_ids(data: Union[Dict, List]) -> Union[Dict, List]:
-    """Recursively converts all ObjectId instances to strings."""
-    if isinstance(data, dict):
-        return {key: convert_object_ids(value) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [convert_object_ids(item) for item in data]
-    elif isinstance(data, ObjectId):
-        return str(data)
-    else:
-        return data
+# Free-text spellings folded onto a map term before matching
+SECTOR_ALIASES = {
+    "analytics": "analysis", "analyst": "analysis",
+    "designing": "design", "designer": "design",
+    "software": "programming", "coding": "programming",
+    "education": "teaching", "teacher": "teaching",
+    "medical": "healthcare", "health care": "healthcare",
+    "financial": "finance", "accounts": "accounting",
+    "admin": "administration", "writing": "writer", "content": "writer",
+}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+def _sector_tokens(text: str) -> tuple:
+    # Crude plural folding, applied to the taxonomy and the postings alike
+    return tuple(w[:-1] if len(w) > 3 and w.endswith('s') and not w.endswith('ss') else w
+                 for w in _WORD_RE.findall(text.lower()))
+
+SECTOR_TERMS = sorted({t for terms in RIASEC_SECTOR_MAP.values() for t in terms})
+SECTOR_IDS = {term: k for k, term in enumerate(SECTOR_TERMS)}
+# Token phrase -> canonical id, aliases included
+_SECTOR_PHRASES = {_sector_tokens(t): SECTOR_IDS[t] for t in SECTOR_TERMS}
+_SECTOR_PHRASES.update({_sector_tokens(a): SECTOR_IDS[t] for a, t in SECTOR_ALIASES.items()})
+_MAX_PHRASE = max(len(p) for p in _SECTOR_PHRASES)
+# Inverted index: RIASEC letter -> canonical sector ids
+TRAIT_SECTOR_IDS = {trait: frozenset(SECTOR_IDS[t] for t in terms) for trait, terms in RIASEC_SECTOR_MAP.items()}
+
+@lru_cache(maxsize=4096)
+def _canonical_sector_ids(sector: str) -> frozenset:
+    tokens = _sector_tokens(sector)
+    ids, i = set(), 0
+    while i < len(tokens):
+        for size in range(min(_MAX_PHRASE, len(tokens) - i), 0, -1):
+            k = _SECTOR_PHRASES.get(tokens[i:i + size])
+            if k is not None:
+                ids.add(k)
+                i += size
+                break
+        else:
+            i += 1
+    return frozenset(ids)
+
+def canonical_sector_ids(sector: Any) -> frozenset:
+    """Canonical sector ids found in a posting's free-text sector."""
+    return _canonical_sector_ids(sector) if isinstance(sector, str) else frozenset()
+
+def trait_sector_ids(traits: List[str]) -> frozenset:
+    """Union of the canonical sector ids behind a set of RIASEC letters."""
+    return frozenset().union(*(TRAIT_SECTOR_IDS.get(t, ()) for t in traits))
+
+# --- Helper Functions ---
 
 def norm(text: str) -> str:
     """Normalizes text by converting to lowercase and stripping whitespace."""
@@ -71,22 +157,16 @@ def arr(v: Any) -> List[Any]:
         return v
     return [v]
 
-async def derive_signals(student: Dict[str, Any]) -> Dict[str, List[str]]:
+def derive_signals(student: Dict[str, Any]) -> Dict[str, List[str]]:
     """Derives skills, roles, and locations from student profile."""
     skills = [norm(s) for s in arr(student.get('skills'))]
     roles = [norm(r) for r in arr(student.get('desiredRole', [])) + arr(student.get('interests', [])) if r]
     locations = [norm(l) for l in arr(student.get('preferredLocations', [])) + arr([student.get('city')]) if l]
     return {'skills': skills, 'roles': roles, 'locations': locations}
 
-async def infer_from_recent_applications(student_id: ObjectId) -> Dict[str, Any]:
-    """Infers skills, roles, and highest level from a student's recent applications."""
-    last_apps_cursor = application_collection.find({
-        'studentId': student_id,
-        'status': 'Completed'
-    }).sort('appliedDate', -1).limit(10)
-    last_apps = await last_apps_cursor.to_list(length=10)
-
-    if not last_apps:
+def summarize_internships(internships: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Skills, roles, locations and highest level from previously completed internships."""
+    if not internships:
         return {'skills': [], 'roles': [], 'locations': [], 'highestLevel': 0}
 
     skills = set()
@@ -95,8 +175,7 @@ async def infer_from_recent_applications(student_id: ObjectId) -> Dict[str, Any]
     locations = set()
     classifications = []
 
-    for app in last_apps:
-        internship = app.get('internshipId') or {}
+    for internship in internships:
         job_skills = internship.get('qualifications', [])
         skills.update([norm(s) for s in job_skills if s])
         job_title = norm(internship.get('jobTitle'))
@@ -121,9 +200,34 @@ async def infer_from_recent_applications(student_id: ObjectId) -> Dict[str, Any]
         'highestLevel': highest_level
     }
 
+@timed('recommendations', 'mongo_query')
+async def fetch_internships_ordered(ids: List[ObjectId], projection=None) -> List[Dict[str, Any]]:
+    """Loads postings by id with one $in query, returned in the order of ids (duplicates kept)."""
+    if not ids:
+        return []
+    docs = await internship_collection.find({'_id': {'$in': list(set(ids))}}, projection).to_list(length=None)
+    by_id = {d['_id']: d for d in docs}
+    return [by_id[i] for i in ids if i in by_id]
+
+async def infer_from_recent_applications(student_id: ObjectId) -> Dict[str, Any]:
+    """Infers skills, roles, and highest level from a student's recent applications."""
+    last_apps_cursor = application_collection.find({
+        'studentId': student_id,
+        'status': 'Completed'
+    }, {'internshipId': 1}).sort('appliedDate', -1).limit(10)
+    last_apps = await last_apps_cursor.to_list(length=10)
+
+    # internshipId is a reference, not an embedded posting
+    internships = await fetch_internships_ordered(
+        [a['internshipId'] for a in last_apps if a.get('internshipId')], INFERENCE_PROJECTION)
+    return summarize_internships(internships)
+
 async def get_personality(student_id_obj: ObjectId) -> Dict[str, Any]:
     """Fetches RIASEC personality test results for a student."""
     personality = await personality_collection.find_one({'userId': student_id_obj})
+    return personality_traits(personality)
+
+def personality_traits(personality: Optional[Dict[str, Any]]) -> Dict[str, Any]:
     if not personality:
         return {'hollandCode': '', 'dominantTraits': []}
     holland_code = personality.get('hollandCode', '') or ''
@@ -132,144 +236,917 @@ async def get_personality(student_id_obj: ObjectId) -> Dict[str, Any]:
         'dominantTraits': list(holland_code) if holland_code else []
     }
 
-def score_job(job: Dict[str, Any], signals: Dict[str, Any], student: Dict[str, Any], dominant_traits: List[str]) -> float:
-    """Scores a single job based on various matching criteria and RIASEC traits."""
-    score = 0.0
-    job_skills = [norm(s) for s in job.get('qualifications', [])]
-    job_title = norm(job.get('jobTitle', ''))
-    job_desc = norm(job.get('jobDescription', ''))
-    job_cat = norm(job.get('sector', ''))
-    job_loc = norm(job.get('location', ''))
-    work_mode = norm(job.get('internshipMode', ''))
-    job_level = LEVEL_RANK.get(norm(job.get('classification', '')), 0)
-
-    skill_hits = len([s for s in signals['skills'] if s in job_skills])
-    score += skill_hits * 3
-
-    role_hit = any(r for r in signals['roles'] if r in job_title or r in job_cat or r in job_desc)
-    if role_hit:
-        score += 5
-
-    fields = [norm(student.get('fieldOfStudy', '')), norm(student.get('desiredField', ''))]
-    for f in fields:
-        if not f:
-            continue
-        if f in job_title or f in job_desc or f in job_cat:
-            score += 5
-        else:
-            sim_scores = [
-                util.cos_sim(embedder.encode(f), embedder.encode(text)).item()
-                for text in [job_title, job_desc, job_cat]
-            ]
-            if max(sim_scores) > 0.6:
-                score += 4
-
-    loc_hit = 'online' in work_mode or 'remote' in work_mode or any(l for l in signals['locations'] if l in job_loc)
-    if loc_hit:
-        score += 3
-
-    student_level = signals.get('highestLevel', 1) or 1
-    if job_level == student_level:
-        score += 3
-    elif job_level == student_level + 1:
-        score += 10
-    elif job_level > student_level + 1:
-        score -= 3
-    else:
-        score -= 1
+def build_profile(student: Dict[str, Any], inferred: Dict[str, Any], personality: Dict[str, Any], applied_ids) -> Dict[str, Any]:
+    """Everything the scorer needs about one student."""
+    base = derive_signals(student)
+    signals = {
+        'skills': list(set(base['skills']).union(inferred['skills'])),
+        'roles': list(set(base['roles']).union(inferred['roles'])),
+        'locations': list(set(base['locations']).union(inferred['locations'])),
+        'highestLevel': inferred.get('highestLevel', 1) or 1
+    }
+    dominant_traits = personality.get('dominantTraits', [])
+    return {
+        'student_id': student['_id'],
+        'signals': signals,
+        'dominant_traits': dominant_traits,
+        'sector_ids': trait_sector_ids(dominant_traits),
+        'fields': [norm(student.get('fieldOfStudy', '')), norm(student.get('desiredField', ''))],
+        'applied': set(applied_ids),
+        'text': ' '.join(signals['skills'] + signals['roles'] + signals['locations']),
+    }
 
-    # RIASEC personality boost
-    for trait in dominant_traits:
-        if job_cat in RIASEC_SECTOR_MAP.get(trait, []):
-            score += 8  # substantial boost for a direct personality/sector match
+def job_text(job: Dict[str, Any]) -> str:
+    return ' '.join(filter(None, [job.get('jobTitle', ''), job.get('jobDescription', '')] + job.get('qualifications', [])))
 
-    return score
+@timed('recommendations', 'embedding_encode')
+def encode_normalized(texts: List[str]) -> np.ndarray:
+    return np.asarray(resources.embedder().encode(
+        texts,
+        batch_size=ENCODE_BATCH_SIZE,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    ), dtype=np.float32)
 
-async def embed_text(text: str):
-    """Encodes text into a vector embedding."""
-    return embedder.encode(text, convert_to_tensor=True)
+# --- Vectorized scoring ---
 
-async def score_job_with_embedding(job: Dict[str, Any], signals: Dict[str, Any], student_embedding, student: Dict[str, Any], dominant_traits: List[str]) -> float:
-    """Combines a base score, embedding similarity, and RIASEC trait boost."""
-    base_score = score_job(job, signals, student, dominant_traits)
-    job_text = ' '.join(filter(None, [job.get('jobTitle', ''), job.get('jobDescription', '')] + job.get('qualifications', [])))
-    job_embedding = await embed_text(job_text)
-    sim_score = util.cos_sim(student_embedding, job_embedding).item()
-    return base_score + sim_score * 10
+def created_key(value: Any) -> datetime:
+    """
+    A posting's createdAt as a naive UTC datetime for sorting. Older
+    postings may carry it as an ISO string, or not at all; those sort as
+    the oldest rather than breaking the comparison.
+    """
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return datetime.min
+    if not isinstance(value, datetime):
+        return datetime.min
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
-# --- API Endpoint ---
+class PostingMatrix:
+    """
+    A set of postings with the per-posting features score rules need,
+    built once and shared by every student scored against it. encode()
+    adds the embedding matrices (job text, title, description, sector),
+    which is the expensive part, so callers run it in an executor.
+    """
 
-@app.get('/recommendations/{student_id}', response_class=ORJSONResponse)
-async def get_personalized_recommendations(student_id: str, limit: int = 6) -> Dict[str, List[Dict[str, Any]]]:
-    if not ObjectId.is_valid(student_id):
+    def __init__(self, jobs: List[Dict[str, Any]]):
+        self.jobs = jobs
+        self.ids = [j['_id'] for j in jobs]
+        self.ordinal = {i: k for k, i in enumerate(self.ids)}
+        self.titles = [norm(j.get('jobTitle', '')) for j in jobs]
+        self.descs = [norm(j.get('jobDescription', '')) for j in jobs]
+        self.cats = [norm(j.get('sector', '')) for j in jobs]
+        self.locs = [norm(j.get('location', '')) for j in jobs]
+        # "\0" can't occur in a role, so a role never matches across fields
+        self.role_texts = ['\0'.join(t) for t in zip(self.titles, self.cats, self.descs)]
+        modes = [norm(j.get('internshipMode', '')) for j in jobs]
+        self.remote = np.array(['online' in m or 'remote' in m for m in modes], dtype=bool)
+        self.level = np.array([LEVEL_RANK.get(norm(j.get('classification', '')), 0) for j in jobs], dtype=np.int32)
+        # Bitset per canonical sector id: sector_bits[k, i] <=> posting i is in sector k
+        self.sector_bits = np.zeros((len(SECTOR_TERMS), len(jobs)), dtype=bool)
+        for i, j in enumerate(jobs):
+            self.sector_bits[list(canonical_sector_ids(j.get('sector'))), i] = True
+        self.entry_level = np.array([j.get('classification') in ('basic', 'intermediate') for j in jobs], dtype=bool)
+        created = [created_key(j.get('createdAt')) for j in jobs]
+        self.newest_first = sorted(range(len(jobs)), key=created.__getitem__, reverse=True)
+
+        self.skill_vocab: Dict[str, int] = {}
+        rows, cols = [], []
+        for i, j in enumerate(jobs):
+            for s in {norm(q) for q in j.get('qualifications', [])}:
+                rows.append(i)
+                cols.append(self.skill_vocab.setdefault(s, len(self.skill_vocab)))
+        self.skill_matrix = np.zeros((len(jobs), max(1, len(self.skill_vocab))), dtype=np.float32)
+        self.skill_matrix[rows, cols] = 1.0
+
+        self.embeddings: Optional[np.ndarray] = None
+        self._masks: Dict[Any, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def take(self, rows) -> "PostingMatrix":
+        """
+        The postings at `rows`, in that order, as a matrix of their own. Rows
+        are sliced out of this one's features and embeddings, so nothing is
+        built or encoded again.
+        """
+        rows = [int(r) for r in rows]
+        sub = PostingMatrix.__new__(PostingMatrix)
+        for name in ('jobs', 'ids', 'titles', 'descs', 'cats', 'locs', 'role_texts'):
+            values = getattr(self, name)
+            setattr(sub, name, [values[r] for r in rows])
+        sub.ordinal = {i: k for k, i in enumerate(sub.ids)}
+        sub.remote = self.remote[rows]
+        sub.level = self.level[rows]
+        sub.sector_bits = self.sector_bits[:, rows]
+        sub.entry_level = self.entry_level[rows]
+        position = {r: k for k, r in enumerate(rows)}
+        sub.newest_first = [position[i] for i in self.newest_first if i in position]
+        sub.skill_vocab = self.skill_vocab
+        sub.skill_matrix = self.skill_matrix[rows]
+        sub.embeddings = None
+        if self.embeddings is not None and rows:
+            sub.embeddings = self.embeddings[rows]
+            sub.title_emb = self.title_emb[rows]
+            sub.desc_emb = self.desc_emb[rows]
+            sub.cat_emb = self.cat_emb[rows]
+        sub._masks = {}
+        return sub
+
+    def encode(self) -> "PostingMatrix":
+        if self.jobs:
+            self.embeddings = encode_normalized([job_text(j) for j in self.jobs])
+            self.title_emb = encode_normalized(self.titles)
+            self.desc_emb = encode_normalized(self.descs)
+            self.cat_emb = encode_normalized(self.cats)
+        return self
+
+    # Masks repeat heavily across students (same roles, cities, sectors), so
+    # each distinct string is matched against the postings once per matrix.
+    def _mask(self, key, build) -> np.ndarray:
+        m = self._masks.get(key)
+        if m is None:
+            m = self._masks[key] = build()
+        return m
+
+    def role_mask(self, role: str) -> np.ndarray:
+        return self._mask(('role', role), lambda: np.array([role in t for t in self.role_texts], dtype=bool))
+
+    def field_text_mask(self, field: str) -> np.ndarray:
+        return self._mask(('field', field), lambda: np.array(
+            [field in t or field in d or field in c for t, d, c in zip(self.titles, self.descs, self.cats)], dtype=bool))
+
+    def location_mask(self, loc: str) -> np.ndarray:
+        return self._mask(('loc', loc), lambda: np.array([loc in l for l in self.locs], dtype=bool))
+
+    def sector_mask(self, sector_ids: frozenset) -> np.ndarray:
+        """Postings in any of the canonical sectors: an OR over their bitsets."""
+        return self._mask(('sector', sector_ids), lambda: self.sector_bits[sorted(sector_ids)].any(axis=0))
+
+    def trait_mask(self, trait: str) -> np.ndarray:
+        return self.sector_mask(TRAIT_SECTOR_IDS.get(trait, frozenset()))
+
+    def id_mask(self, ids) -> np.ndarray:
+        """Bitmap over posting ordinals; cost is O(len(ids)), not O(postings)."""
+        mask = np.zeros(len(self.jobs), dtype=bool)
+        mask[[self.ordinal[i] for i in ids if i in self.ordinal]] = True
+        return mask
+
+@timed('recommendations', 'scoring')
+def score_cohort(matrix: PostingMatrix, profiles: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Scores every profile against every posting: the same rules as the
+    original per-job score_job, evaluated as array operations, plus 10x
+    the cosine similarity of student and job text. One encode for the
+    cohort's texts and one matrix product for the similarities.
+    """
+    n, p = len(profiles), len(matrix)
+    if not n or not p:
+        return np.zeros((n, p), dtype=np.float32)
+
+    student_emb = encode_normalized([pr['text'] for pr in profiles])
+    scores = (student_emb @ matrix.embeddings.T) * 10.0
+
+    # Skill hits: (students x vocab) @ (vocab x postings)
+    student_skills = np.zeros((n, matrix.skill_matrix.shape[1]), dtype=np.float32)
+    for r, pr in enumerate(profiles):
+        cols = [matrix.skill_vocab[s] for s in set(pr['signals']['skills']) if s in matrix.skill_vocab]
+        student_skills[r, cols] = 1.0
+    scores += 3.0 * (student_skills @ matrix.skill_matrix.T)
+
+    # Study-field similarity only matters where the field isn't a substring
+    fields = sorted({f for pr in profiles for f in pr['fields'] if f})
+    field_close: Dict[str, np.ndarray] = {}
+    if fields:
+        fe = encode_normalized(fields)
+        sims = np.maximum.reduce([fe @ matrix.title_emb.T, fe @ matrix.desc_emb.T, fe @ matrix.cat_emb.T])
+        field_close = {f: sims[k] > FIELD_SIM_THRESHOLD for k, f in enumerate(fields)}
+
+    for r, pr in enumerate(profiles):
+        row = scores[r]
+        signals = pr['signals']
+
+        role_hit = np.zeros(p, dtype=bool)
+        for role in signals['roles']:
+            if role:
+                role_hit |= matrix.role_mask(role)
+        row += 5.0 * role_hit
+
+        for f in pr['fields']:
+            if not f:
+                continue
+            in_text = matrix.field_text_mask(f)
+            row += np.where(in_text, 5.0, np.where(field_close[f], 4.0, 0.0))
+
+        loc_hit = matrix.remote.copy()
+        for loc in signals['locations']:
+            if loc:
+                loc_hit |= matrix.location_mask(loc)
+        row += 3.0 * loc_hit
+
+        level = signals.get('highestLevel', 1) or 1
+        row += np.select(
+            [matrix.level == level, matrix.level == level + 1, matrix.level > level + 1],
+            [3.0, 10.0, -3.0], default=-1.0)
+
+        for trait in pr['dominant_traits']:
+            row += 8.0 * matrix.trait_mask(trait)
+    return scores
+
+def candidate_mask(matrix: PostingMatrix, profile: Dict[str, Any]) -> np.ndarray:
+    """Not yet applied to; restricted to the personality's sectors when any match."""
+    open_ = ~matrix.id_mask(profile['applied']) if profile['applied'] else np.ones(len(matrix), dtype=bool)
+    if profile['sector_ids']:
+        in_sector = open_ & matrix.sector_mask(profile['sector_ids'])
+        if in_sector.any():
+            return in_sector
+    return open_
+
+def rank_profile(matrix: PostingMatrix, profile: Dict[str, Any], scores: np.ndarray, top_n: int) -> Dict[str, Any]:
+    mask = candidate_mask(matrix, profile)
+    idx = np.flatnonzero(mask)
+    order = idx[np.argsort(-scores[idx], kind='stable')][:top_n]
+    if len(order) and scores[order[0]] > 0:
+        return {'internshipIds': [matrix.ids[i] for i in order],
+                'scores': [round(float(scores[i]), 4) for i in order],
+                'fallback': False}
+    # Nothing scores above zero: newest entry-level postings instead
+    eligible = (~matrix.id_mask(profile['applied'])) & matrix.entry_level
+    picks = [i for i in matrix.newest_first if eligible[i]][:top_n]
+    return {'internshipIds': [matrix.ids[i] for i in picks], 'scores': [], 'fallback': True}
+
+# --- Loading ---
+
+_posting_matrix: Optional[PostingMatrix] = None
+_posting_matrix_at: Optional[datetime] = None
+_posting_matrix_lock = asyncio.Lock()
+
+async def get_posting_matrix(refresh: bool = False) -> PostingMatrix:
+    """
+    All open postings, encoded. Shared by cohort requests and batch runs
+    and rebuilt after POSTING_MATRIX_TTL seconds (or when refresh=True).
+    """
+    global _posting_matrix, _posting_matrix_at
+    async with _posting_matrix_lock:
+        stale = (_posting_matrix is None or refresh
+                 or datetime.utcnow() - _posting_matrix_at > timedelta(seconds=POSTING_MATRIX_TTL))
+        cache_result('recommendations', 'posting_matrix', not stale)
+        if stale:
+            postings = await internship_collection.find({'applicationOpen': True}).to_list(length=None)
+            loop = asyncio.get_running_loop()
+            _posting_matrix = await loop.run_in_executor(None, lambda: PostingMatrix(postings).encode())
+            _posting_matrix_at = datetime.utcnow()
+        return _posting_matrix
+
+@timed('recommendations', 'mongo_query')
+async def load_profiles(student_ids: List[ObjectId]) -> List[Dict[str, Any]]:
+    """
+    Profiles for many students with one $in query per collection: users,
+    personality results, applications, and the postings behind the last
+    10 completed applications of each student.
+    """
+    if not student_ids:
+        return []
+    students = await user_collection.find({'_id': {'$in': student_ids}}, STUDENT_PROJECTION).to_list(length=None)
+    personalities: Dict[Any, Dict[str, Any]] = {}
+    async for doc in personality_collection.find({'userId': {'$in': student_ids}}, {'userId': 1, 'hollandCode': 1}):
+        personalities.setdefault(doc['userId'], doc)
+
+    applied: Dict[Any, set] = {sid: set() for sid in student_ids}
+    completed: Dict[Any, List[Dict[str, Any]]] = {sid: [] for sid in student_ids}
+    apps_cursor = application_collection.find(
+        {'studentId': {'$in': student_ids}},
+        {'studentId': 1, 'internshipId': 1, 'status': 1, 'appliedDate': 1})
+    async for app_doc in apps_cursor:
+        sid = app_doc['studentId']
+        applied.setdefault(sid, set()).add(app_doc.get('internshipId'))
+        if app_doc.get('status') == 'Completed':
+            completed.setdefault(sid, []).append(app_doc)
+
+    recent: Dict[Any, List[ObjectId]] = {}
+    for sid, apps in completed.items():
+        apps.sort(key=lambda a: a.get('appliedDate') or datetime.min, reverse=True)
+        recent[sid] = [a['internshipId'] for a in apps[:10] if a.get('internshipId')]
+    needed = list({i for ids in recent.values() for i in ids})
+    postings = {d['_id']: d for d in await internship_collection.find(
+        {'_id': {'$in': needed}}, INFERENCE_PROJECTION).to_list(length=None)} if needed else {}
+
+    profiles = []
+    for student in students:
+        sid = student['_id']
+        inferred = summarize_internships([postings[i] for i in recent.get(sid, []) if i in postings])
+        profiles.append(build_profile(student, inferred, personality_traits(personalities.get(sid)), applied.get(sid, set())))
+    return profiles
+
+# --- Indexes & query plans ---
+
+# (collection, keys) for every query shape this service runs
+RECOMMENDATION_INDEXES = [
+    (application_collection, [("studentId", 1), ("status", 1), ("appliedDate", -1)]),  # recent completed
+    (application_collection, [("studentId", 1), ("internshipId", 1)]),  # applied ids / distinct
+    (personality_collection, [("userId", 1)]),
+    (internship_collection, [("applicationOpen", 1)]),  # posting matrix
+    (internship_collection, [("updatedAt", 1)]),  # cache watcher polling
+    (user_collection, [("isActive", 1)]),  # batch: active students
+    (user_collection, [("updatedAt", 1)]),
+    (batch_runs_collection, [("startedAt", -1)]),
+]
+
+@router.on_event("startup")
+async def ensure_indexes():
+    for collection, keys in RECOMMENDATION_INDEXES:
+        try:
+            await collection.create_index(keys)
+        except OperationFailure as e:
+            # e.g. an equivalent index already exists under another name
+            print(f"[recommendations] index {collection.name} {keys}: {e}")
+
+async def _sample_student_id() -> ObjectId:
+    doc = await application_collection.find_one({}, {'studentId': 1})
+    return doc['studentId'] if doc and doc.get('studentId') else ObjectId()
+
+def hot_queries(student_id: ObjectId) -> List[Dict[str, Any]]:
+    """The recommendation queries as explain commands, with a real student id plugged in."""
+    find = lambda coll, flt, **kw: {'find': coll.name, 'filter': flt, **kw}  # noqa: E731
+    return [
+        {'name': 'recent_completed_applications',
+         'command': find(application_collection, {'studentId': student_id, 'status': 'Completed'},
+                         sort={'appliedDate': -1}, limit=10)},
+        {'name': 'applied_internship_ids',
+         'command': {'distinct': application_collection.name, 'key': 'internshipId', 'query': {'studentId': student_id}}},
+        {'name': 'cohort_applications',
+         'command': find(application_collection, {'studentId': {'$in': [student_id]}})},
+        {'name': 'personality_by_user',
+         'command': find(personality_collection, {'userId': student_id}, limit=1)},
+        {'name': 'open_postings',
+         'command': find(internship_collection, {'applicationOpen': True})},
+        {'name': 'active_students',
+         'command': find(user_collection, ACTIVE_STUDENT_QUERY, projection={'_id': 1})},
+    ]
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flattens a winningPlan (classic or SBE "queryPlan" form) into its stages."""
+    plan = plan.get('queryPlan', plan)
+    stages = [plan]
+    for child in [plan.get('inputStage')] + list(plan.get('inputStages') or []):
+        if child:
+            stages.extend(_plan_stages(child))
+    return stages
+
+def summarize_explain(name: str, explain: Dict[str, Any]) -> Dict[str, Any]:
+    planner = explain.get('queryPlanner', {})
+    stages = _plan_stages(planner.get('winningPlan', {}))
+    kinds = [st.get('stage') for st in stages]
+    stats = explain.get('executionStats', {})
+    return {
+        'name': name,
+        'namespace': planner.get('namespace'),
+        'stages': kinds,
+        'indexes': sorted({st['indexName'] for st in stages if st.get('indexName')}),
+        'collectionScan': 'COLLSCAN' in kinds,
+        'inMemorySort': 'SORT' in kinds,
+        'nReturned': stats.get('nReturned'),
+        'keysExamined': stats.get('totalKeysExamined'),
+        'docsExamined': stats.get('totalDocsExamined'),
+        'millis': stats.get('executionTimeMillis'),
+    }
+
+async def explain_hot_queries(student_id: Optional[ObjectId] = None) -> Dict[str, Any]:
+    student_id = student_id or await _sample_student_id()
+    results = []
+    for q in hot_queries(student_id):
+        try:
+            explain = await db.command({'explain': q['command'], 'verbosity': 'executionStats'})
+            results.append(summarize_explain(q['name'], explain))
+        except OperationFailure as e:
+            results.append({'name': q['name'], 'error': str(e)})
+    flagged = [r['name'] for r in results if r.get('collectionScan')]
+    return {'ok': not flagged, 'studentId': str(student_id), 'collectionScans': flagged, 'queries': results}
+
+@router.get('/recommendations/diagnostics/query-plans')
+async def recommendation_query_plans(studentId: Optional[str] = None):
+    if studentId and not ObjectId.is_valid(studentId):
         raise HTTPException(status_code=400, detail="Invalid student ID")
+    return MongoJSONResponse(await explain_hot_queries(ObjectId(studentId) if studentId else None))
 
-    print("Generating fresh recommendations (no cache)")
+# --- Batch runs ---
 
-    student_id_obj = ObjectId(student_id)
-    student = await user_collection.find_one({'_id': student_id_obj})
+_batch_lock = asyncio.Lock()
+
+async def _acquire_lease(batch_id: str) -> bool:
+    """Cross-process guard so only one worker runs the batch at a time."""
+    now = datetime.utcnow()
+    try:
+        await batch_runs_collection.find_one_and_update(
+            {'_id': 'lease', '$or': [{'until': {'$lt': now}}, {'until': {'$exists': False}}]},
+            {'$set': {'until': now + timedelta(seconds=RECOMMENDATION_BATCH_LEASE_SECONDS), 'batchId': batch_id}},
+            upsert=True)
+        return True
+    except DuplicateKeyError:
+        return False
+
+async def _release_lease(batch_id: str) -> None:
+    await batch_runs_collection.update_one({'_id': 'lease', 'batchId': batch_id}, {'$unset': {'until': ''}})
+
+async def run_recommendation_batch(batch_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Recomputes the top RECOMMENDATION_TOP_N postings for every active
+    student and writes them to recommendation_results. Open postings are
+    loaded and encoded once; students are scored in chunks of
+    RECOMMENDATION_BATCH_CHUNK against that one matrix.
+    """
+    batch_id = batch_id or uuid.uuid4().hex
+    if _batch_lock.locked() or not await _acquire_lease(batch_id):
+        return {'ok': False, 'batchId': batch_id, 'error': 'A recommendation batch is already running'}
+
+    async with _batch_lock:
+        loop = asyncio.get_running_loop()
+        started = datetime.utcnow()
+        run = {'_id': batch_id, 'status': 'running', 'startedAt': started, 'students': 0}
+        await batch_runs_collection.insert_one(run)
+        try:
+            matrix = await get_posting_matrix(refresh=True)
+
+            async def flush(ids: List[ObjectId]) -> int:
+                profiles = await load_profiles(ids)
+                scores = await loop.run_in_executor(None, score_cohort, matrix, profiles)
+                now = datetime.utcnow()
+                ops = []
+                for r, profile in enumerate(profiles):
+                    ranked = rank_profile(matrix, profile, scores[r], RECOMMENDATION_TOP_N)
+                    ops.append(ReplaceOne({'_id': profile['student_id']}, {
+                        **ranked, 'generatedAt': now, 'batchId': batch_id}, upsert=True))
+                if ops:
+                    await results_collection.bulk_write(ops, ordered=False)
+                return len(ops)
+
+            chunk: List[ObjectId] = []
+            async for doc in user_collection.find(ACTIVE_STUDENT_QUERY, {'_id': 1}).batch_size(RECOMMENDATION_BATCH_CHUNK):
+                chunk.append(doc['_id'])
+                if len(chunk) >= RECOMMENDATION_BATCH_CHUNK:
+                    run['students'] += await flush(chunk)
+                    chunk = []
+            if chunk:
+                run['students'] += await flush(chunk)
+
+            run.update(status='succeeded', postings=len(matrix))
+        except Exception as e:
+            run.update(status='failed', error=f"{type(e).__name__}: {e}")
+            print(f"[recommendations] batch {batch_id} failed: {run['error']}")
+        finally:
+            run['finishedAt'] = datetime.utcnow()
+            run['elapsedSeconds'] = round((run['finishedAt'] - started).total_seconds(), 2)
+            await batch_runs_collection.replace_one({'_id': batch_id}, run)
+            await _release_lease(batch_id)
+    if run['status'] == 'succeeded':
+        recommendation_cache.invalidate_all()
+    return {'ok': run['status'] == 'succeeded', 'batchId': batch_id, **{k: v for k, v in run.items() if k != '_id'}}
+
+def _seconds_until_next_run(now: datetime) -> float:
+    nxt = now.replace(hour=RECOMMENDATION_BATCH_HOUR, minute=0, second=0, microsecond=0)
+    if nxt <= now:
+        nxt += timedelta(days=1)
+    return (nxt - now).total_seconds()
+
+async def nightly_batch_loop():
+    while True:
+        await asyncio.sleep(_seconds_until_next_run(datetime.utcnow()))
+        try:
+            result = await run_recommendation_batch()
+            print(f"[recommendations] nightly batch: {result}")
+        except Exception as e:
+            print(f"[recommendations] nightly batch error: {e}")
+
+_batch_task: Optional[asyncio.Task] = None
+
+@router.on_event("startup")
+async def start_batch_scheduler():
+    global _batch_task
+    if RECOMMENDATION_BATCH_SCHEDULE:
+        _batch_task = asyncio.create_task(nightly_batch_loop())
+
+@router.on_event("shutdown")
+async def stop_batch_scheduler():
+    if _batch_task:
+        _batch_task.cancel()
+
+# --- Serving ---
+
+async def load_precomputed(student_id_obj: ObjectId, limit: int) -> Optional[List[Dict[str, Any]]]:
+    """Fresh batch results for the student, or None when missing/stale/too short."""
+    with stage('recommendations', 'mongo_query'):
+        doc = await results_collection.find_one({'_id': student_id_obj})
+    if not doc or not doc.get('generatedAt'):
+        return None
+    if datetime.utcnow() - doc['generatedAt'] > timedelta(hours=RECOMMENDATION_MAX_AGE_HOURS):
+        return None
+    ids = doc.get('internshipIds') or []
+    # Drop postings the student applied to, or that closed, since the batch ran
+    with stage('recommendations', 'mongo_query'):
+        applied = set(await application_collection.distinct('internshipId', {'studentId': student_id_obj, 'internshipId': {'$in': ids}}))
+    jobs = [j for j in await fetch_internships_ordered([i for i in ids if i not in applied])
+            if j.get('applicationOpen')]
+    if len(jobs) < min(limit, len(ids)):
+        return None
+    return jobs[:limit]
+
+async def compute_recommendations(student_id_obj: ObjectId, student: Dict[str, Any], top_n: int) -> Dict[str, Any]:
+    """
+    On-demand path for a single student; same scoring as the batch. The
+    first CANDIDATE_LIMIT candidates are sliced out of the shared posting
+    matrix, so a request encodes only the student's own texts.
+    """
+    inferred = await infer_from_recent_applications(student_id_obj)
+    personality = await get_personality(student_id_obj)
+    applied_ids = await application_collection.distinct('internshipId', {'studentId': student_id_obj})
+    profile = build_profile(student, inferred, personality, applied_ids)
+
+    matrix = await get_posting_matrix()
+    candidates = matrix.take(np.flatnonzero(candidate_mask(matrix, profile))[:CANDIDATE_LIMIT])
+
+    loop = asyncio.get_running_loop()
+    scores = (await loop.run_in_executor(None, score_cohort, candidates, [profile]))[0]
+    order = np.argsort(-scores, kind='stable')[:top_n] if len(candidates) else []
+
+    if len(order) and scores[order[0]] > 0:
+        return {'jobs': [candidates.jobs[i] for i in order],
+                'scores': [round(float(scores[i]), 4) for i in order], 'fallback': False}
+
+    # Nothing scores above zero: newest entry-level postings instead
+    eligible = (~matrix.id_mask(profile['applied'])) & matrix.entry_level
+    picks = [i for i in matrix.newest_first if eligible[i]][:top_n]
+    return {'jobs': [matrix.jobs[i] for i in picks], 'scores': [], 'fallback': True}
+
+# --- Result cache ---
+
+class RecommendationCache:
+    """
+    Final ranked internship ids per (student, limit), in process memory.
+    Entries expire after RECOMMENDATION_CACHE_TTL and are dropped early by
+    CacheInvalidationWatcher. ETags hash the ids with postings_version,
+    which moves whenever postings change, so a changed posting body also
+    changes the tag.
+    """
+
+    def __init__(self, ttl: float = RECOMMENDATION_CACHE_TTL, max_entries: int = RECOMMENDATION_CACHE_MAX):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.postings_version = 0
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._by_student: Dict[ObjectId, set] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, student_id: ObjectId, limit: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((student_id, limit))
+        if entry is None or (datetime.utcnow() - entry['at']).total_seconds() > self.ttl:
+            self.misses += 1
+            cache_result('recommendations', 'results', False)
+            return None
+        self._entries.move_to_end((student_id, limit))
+        self.hits += 1
+        cache_result('recommendations', 'results', True)
+        return entry
+
+    def put(self, student_id: ObjectId, limit: int, ids: List[ObjectId], source: str) -> Dict[str, Any]:
+        digest = hashlib.sha1(f"{self.postings_version}:{source}:{','.join(map(str, ids))}".encode()).hexdigest()
+        entry = {'ids': ids, 'source': source, 'etag': f'"{digest}"', 'at': datetime.utcnow()}
+        if self.ttl <= 0:
+            return entry
+        key = (student_id, limit)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._by_student.setdefault(student_id, set()).add(limit)
+        while len(self._entries) > self.max_entries:
+            (sid, lim), _ = self._entries.popitem(last=False)
+            self._by_student.get(sid, set()).discard(lim)
+        return entry
+
+    def invalidate_student(self, student_id: ObjectId) -> int:
+        limits = self._by_student.pop(student_id, set())
+        for lim in limits:
+            self._entries.pop((student_id, lim), None)
+        return len(limits)
+
+    def invalidate_all(self) -> int:
+        n = len(self._entries)
+        self._entries.clear()
+        self._by_student.clear()
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                'postingsVersion': self.postings_version}
+
+recommendation_cache = RecommendationCache()
+
+class CacheInvalidationWatcher:
+    """
+    Turns data changes into cache invalidations.
+
+    A student's profile (userwebapps), applications or personality result
+    changing drops their cached lists and stored batch result; any posting
+    change drops everything and the shared posting matrix.
+
+    mode "change_stream" tails Mongo change streams; "poll" scans for new
+    or updated documents every RECOMMENDATION_CACHE_POLL_SECONDS (updatedAt
+    where the model has timestamps, otherwise new _ids, so in-place
+    application/personality edits are only caught by the TTL); "auto"
+    tries change streams and falls back to polling on standalone servers.
+    "memory" starts nothing: callers (tests, admin endpoint) push events
+    through student_changed() / postings_changed().
+    """
+
+    def __init__(self, cache: RecommendationCache, mode: str = RECOMMENDATION_CACHE_WATCH):
+        self.cache = cache
+        self.mode = mode
+        self.active_mode: Optional[str] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def student_changed(self, student_id: Optional[ObjectId]) -> None:
+        if student_id is None:
+            # e.g. a delete event without the student on it
+            self.cache.invalidate_all()
+            return
+        self.cache.invalidate_student(student_id)
+        await results_collection.delete_one({'_id': student_id})
+
+    async def postings_changed(self) -> None:
+        global _posting_matrix
+        self.cache.postings_version += 1
+        self.cache.invalidate_all()
+        _posting_matrix = None
+
+    # Change streams
+
+    async def _tail(self, collection, handler) -> None:
+        resume_token = None
+        while True:
+            try:
+                async with collection.watch(full_document='updateLookup', resume_after=resume_token) as stream:
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        await handler(change)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure:
+                raise
+            except Exception as e:
+                print(f"[recommendations] change stream on {collection.name} dropped: {e}")
+                await asyncio.sleep(5)
+
+    def _student_handler(self, field: Optional[str]):
+        async def handle(change: Dict[str, Any]) -> None:
+            if field is None:
+                await self.student_changed(change.get('documentKey', {}).get('_id'))
+            else:
+                await self.student_changed((change.get('fullDocument') or {}).get(field))
+        return handle
+
+    async def _posting_handler(self, change: Dict[str, Any]) -> None:
+        await self.postings_changed()
+
+    async def _watch_change_streams(self) -> None:
+        tails = [asyncio.create_task(t) for t in (
+            self._tail(user_collection, self._student_handler(None)),
+            self._tail(application_collection, self._student_handler('studentId')),
+            self._tail(personality_collection, self._student_handler('userId')),
+            self._tail(internship_collection, self._posting_handler),
+        )]
+        try:
+            await asyncio.gather(*tails)
+        finally:
+            for t in tails:
+                t.cancel()
+
+    # Polling
+
+    async def _watermark(self, collection, field: str):
+        doc = await collection.find_one({field: {'$exists': True}}, {field: 1}, sort=[(field, -1)])
+        return doc[field] if doc else None
+
+    async def _poll(self) -> None:
+        # (collection, watermark field, student field or None for postings/users)
+        sources = [
+            (user_collection, 'updatedAt', '_id'),
+            (application_collection, '_id', 'studentId'),
+            (personality_collection, '_id', 'userId'),
+            (internship_collection, 'updatedAt', None),
+        ]
+        marks = [await self._watermark(c, f) for c, f, _ in sources]
+        while True:
+            await asyncio.sleep(RECOMMENDATION_CACHE_POLL_SECONDS)
+            for k, (coll, field, student_field) in enumerate(sources):
+                query = {field: {'$gt': marks[k]}} if marks[k] is not None else {field: {'$exists': True}}
+                projection = {field: 1, **({student_field: 1} if student_field else {})}
+                changed = await coll.find(query, projection).sort(field, 1).to_list(length=None)
+                if not changed:
+                    continue
+                marks[k] = changed[-1][field]
+                if student_field is None:
+                    await self.postings_changed()
+                else:
+                    for sid in {d.get(student_field) for d in changed}:
+                        if sid is not None:
+                            await self.student_changed(sid)
+
+    async def _run(self) -> None:
+        if self.mode in ('auto', 'change_stream'):
+            try:
+                self.active_mode = 'change_stream'
+                await self._watch_change_streams()
+                return
+            except OperationFailure as e:
+                # Change streams need a replica set / sharded cluster
+                if self.mode == 'change_stream':
+                    print(f"[recommendations] change streams unavailable: {e}")
+                    self.active_mode = None
+                    return
+                print(f"[recommendations] change streams unavailable, polling instead: {e}")
+        self.active_mode = 'poll'
+        await self._poll()
+
+    def start(self) -> None:
+        if self.mode in ('off', 'memory') or self._tasks:
+            self.active_mode = self.mode
+            return
+        self._tasks.append(asyncio.create_task(self._run()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+cache_watcher = CacheInvalidationWatcher(recommendation_cache)
+
+@router.on_event("startup")
+async def start_cache_watcher():
+    cache_watcher.start()
+
+@router.on_event("shutdown")
+async def stop_cache_watcher():
+    await cache_watcher.stop()
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(',')]
+    return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+def _cache_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+    return {'ETag': entry['etag'], 'Cache-Control': 'private, no-cache'}
+
+# --- API Endpoint ---
+
+async def _fresh_or_precomputed(student_id_obj: ObjectId, limit: int, fresh: bool):
+    if not fresh:
+        precomputed = await load_precomputed(student_id_obj, limit)
+        if precomputed is not None:
+            return precomputed, 'batch'
+
+    student = await user_collection.find_one({'_id': student_id_obj}, STUDENT_PROJECTION)
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
 
-    signals = await derive_signals(student)
-    inferred = await infer_from_recent_applications(student_id_obj)
+    computed = await compute_recommendations(student_id_obj, student, max(limit, RECOMMENDATION_TOP_N))
+    # Store it so the next request is served from results until the nightly run
+    await results_collection.replace_one({'_id': student_id_obj}, {
+        'internshipIds': [j['_id'] for j in computed['jobs']],
+        'scores': computed['scores'],
+        'fallback': computed['fallback'],
+        'generatedAt': datetime.utcnow(),
+        'batchId': None,
+    }, upsert=True)
 
-    highest_level = inferred.get('highestLevel', 1) or 1
+    return computed['jobs'][:limit], 'live'
 
-    signals = {
-        'skills': list(set(signals['skills']).union(inferred['skills'])),
-        'roles': list(set(signals['roles']).union(inferred['roles'])),
-        'locations': list(set(signals['locations']).union(inferred['locations'])),
-        'highestLevel': highest_level
-    }
+@router.get('/recommendations/{student_id}')
+async def get_personalized_recommendations(student_id: str, limit: int = 6, fresh: bool = False,
+                                           if_none_match: Optional[str] = Header(default=None)):
+    if not ObjectId.is_valid(student_id):
+        raise HTTPException(status_code=400, detail="Invalid student ID")
 
-    personality = await get_personality(student_id_obj)
-    dominant_traits = personality.get('dominantTraits', [])
+    student_id_obj = ObjectId(student_id)
+    entry = None if fresh else recommendation_cache.get(student_id_obj, limit)
+    if entry is not None:
+        # Hit: answer 304 before touching Mongo at all
+        if _etag_matches(if_none_match, entry['etag']):
+            return Response(status_code=304, headers=_cache_headers(entry))
+        jobs = await fetch_internships_ordered(entry['ids'])
+    else:
+        jobs, source = await _fresh_or_precomputed(student_id_obj, limit, fresh)
+        entry = recommendation_cache.put(student_id_obj, limit, [j['_id'] for j in jobs], source)
+        if _etag_matches(if_none_match, entry['etag']):
+            return Response(status_code=304, headers=_cache_headers(entry))
 
-    applied_ids = await application_collection.distinct('internshipId', {'studentId': student_id_obj})
+    return MongoJSONResponse({'recommendations': jobs, 'source': entry['source']}, headers=_cache_headers(entry))
 
-    matched_sectors = set()
-    for trait in dominant_traits:
-        matched_sectors.update(RIASEC_SECTOR_MAP.get(trait, []))
+@router.post('/recommendations/cache/invalidate')
+async def invalidate_recommendation_cache(studentId: Optional[str] = None, postings: bool = False):
+    """Manual hook for writers that bypass the watcher (or when it is off)."""
+    if studentId:
+        if not ObjectId.is_valid(studentId):
+            raise HTTPException(status_code=400, detail="Invalid student ID")
+        await cache_watcher.student_changed(ObjectId(studentId))
+    elif postings:
+        await cache_watcher.postings_changed()
+    else:
+        recommendation_cache.invalidate_all()
+    return {'ok': True, **recommendation_cache.stats(), 'watcher': cache_watcher.active_mode}
 
-    query = {
-        'applicationOpen': True,
-        '_id': {'$nin': applied_ids}
-    }
-    if matched_sectors:
-        query['sector'] = {'$in': list(matched_sectors)}
-
-    candidates_cursor = internship_collection.find(query).limit(100)
-    candidates = await candidates_cursor.to_list(length=100)
-
-    if not candidates:
-        query = {
-            'applicationOpen': True,
-            '_id': {'$nin': applied_ids}
-        }
-        candidates_cursor = internship_collection.find(query).limit(100)
-        candidates = await candidates_cursor.to_list(length=100)
-
-    student_text = ' '.join(signals['skills'] + signals['roles'] + signals['locations'])
-    student_embedding = await embed_text(student_text)
-
-    scored_jobs = []
-    for job in candidates:
-        score = await score_job_with_embedding(job, signals, student_embedding, student, dominant_traits)
-        scored_jobs.append({'job': job, 'score': score})
-    scored_jobs.sort(key=lambda x: x['score'], reverse=True)
-
-    final_list = [item['job'] for item in scored_jobs[:limit]]
-
-    if not final_list or (scored_jobs and scored_jobs[0]['score'] <= 0):
-        fallback_cursor = internship_collection.find({
-            'applicationOpen': True,
-            '_id': {'$nin': applied_ids},
-            'classification': {'$in': ['basic', 'intermediate']}
-        }).sort('createdAt', -1).limit(limit)
-        fallback_docs = await fallback_cursor.to_list(length=limit)
-        final_list = fallback_docs
-
-    final_list = convert_object_ids(final_list)
-
-    return {'recommendations': final_list}
\ No newline at end of file
+@router.post('/recommendations/batch/run', status_code=202)
+async def trigger_recommendation_batch(background_tasks: BackgroundTasks):
+    if _batch_lock.locked():
+        raise HTTPException(status_code=409, detail="A recommendation batch is already running")
+    batch_id = uuid.uuid4().hex
+    background_tasks.add_task(run_recommendation_batch, batch_id)
+    return {'ok': True, 'batchId': batch_id}
+
+@router.get('/recommendations/batch/runs')
+async def list_recommendation_batches(limit: int = 10):
+    runs = await batch_runs_collection.find({'_id': {'$ne': 'lease'}}).sort('startedAt', -1).limit(limit).to_list(length=limit)
+    return MongoJSONResponse({'runs': runs})
+
+class CohortRequest(BaseModel):
+    studentIds: List[str]
+    limit: int = 6
+
+@router.post('/recommendations/cohort')
+async def get_cohort_recommendations(payload: CohortRequest) -> MongoJSONResponse:
+    """
+    Recommendations for many students at once (counsellor / school-admin
+    views). The cohort is loaded with $in queries and scored as one matrix
+    against the shared open-postings matrix. Postings are returned once in
+    "postings"; each student maps to an ordered list of their ids.
+    """
+    ids: List[ObjectId] = []
+    for sid in dict.fromkeys(payload.studentIds):
+        if not ObjectId.is_valid(sid):
+            raise HTTPException(status_code=400, detail=f"Invalid student ID: {sid}")
+        ids.append(ObjectId(sid))
+    if len(ids) > RECOMMENDATION_COHORT_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {RECOMMENDATION_COHORT_MAX} students per request")
+    limit = max(1, payload.limit)
+
+    matrix = await get_posting_matrix()
+    profiles = await load_profiles(ids)
+    loop = asyncio.get_running_loop()
+    scores = await loop.run_in_executor(None, score_cohort, matrix, profiles)
+
+    by_id = {j['_id']: j for j in matrix.jobs}
+    recommendations: Dict[str, List[str]] = {}
+    postings: Dict[str, Dict[str, Any]] = {}
+    for r, profile in enumerate(profiles):
+        ranked = rank_profile(matrix, profile, scores[r], limit)
+        recommendations[str(profile['student_id'])] = [str(i) for i in ranked['internshipIds']]
+        for i in ranked['internshipIds']:
+            postings.setdefault(str(i), by_id[i])
+
+    found = {p['student_id'] for p in profiles}
+    return MongoJSONResponse({
+        'recommendations': recommendations,
+        'postings': postings,
+        'missing': [str(i) for i in ids if i not in found],
+    })
+
+# Standalone service (uvicorn recommendation:app); server.py mounts `router` instead
+app = FastAPI(default_response_class=MongoJSONResponse)
+app.include_router(router)
+instrument(app, 'recommendations')
+profile_requests(app, 'recommendations')
+
+@app.on_event("startup")
+def load_embedder():
+    # Load the model at boot rather than on the first request
+    resources.embedder()
+
+@app.on_event("shutdown")
+async def close_mongo():
+    resources.close_motor_clients()
+
+if __name__ == "__main__":
+    # python recommendation.py [--ensure-indexes] [--student-id ID]
+    # Prints the query-plan report; exits 1 if any hot query scans a collection.
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Explain the recommendation service's hot queries")
+    parser.add_argument("--ensure-indexes", action="store_true", help="create the indexes first")
+    parser.add_argument("--student-id", help="student to plug into the queries (default: any applicant)")
+    args = parser.parse_args()
+
+    async def _cli():
+        if args.ensure_indexes:
+            await ensure_indexes()
+        return await explain_hot_queries(ObjectId(args.student_id) if args.student_id else None)
+
+    report = asyncio.run(_cli())
+    print(dumps(report, orjson.OPT_INDENT_2).decode())
+    sys.exit(0 if report['ok'] else 1)
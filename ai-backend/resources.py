@@ -0,0 +1,150 @@
+"""
+Process-wide resources shared by the ai-backend services.
+
+Each accessor builds its resource on first use and hands the same instance
+to every caller after that, so a process serving several services (see
+server.py) holds one embedding model, one Bedrock client and one Mongo
+client per URI and driver (Motor for the async services, pymongo for
+Instructor.py's threaded assignment jobs) instead of one per service.
+
+Pre-fork serving (gunicorn.conf.py) sets AI_BACKEND_PRELOAD=1: server.py
+then calls preload() in the master, the workers fork from it and share the
+model weights copy-on-write. Only weights are loaded there. Network clients
+are not fork-safe and stay lazy (Mongo clients are created with
+connect=False), so each worker opens its own connections on first use.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+PRELOAD = os.getenv("AI_BACKEND_PRELOAD", "0") == "1"
+
+# Motor connection pool sizing (per worker process)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+
+_lock = threading.RLock()
+_embedders: Dict[str, Any] = {}
+_motor_clients: Dict[str, Any] = {}
+_pymongo_clients: Dict[str, Any] = {}
+_bedrock_client: Any = None
+
+
+def embedder(name: str = EMBEDDING_MODEL):
+    """The SentenceTransformer for `name`, loaded once per process."""
+    model = _embedders.get(name)
+    if model is None:
+        with _lock:
+            model = _embedders.get(name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"[resources] Loading embedding model {name}...")
+                model = _embedders[name] = SentenceTransformer(name)
+    return model
+
+
+def bedrock_client():
+    """bedrock-runtime client; raises ValueError if the AWS settings are missing."""
+    global _bedrock_client
+    if _bedrock_client is None:
+        with _lock:
+            if _bedrock_client is None:
+                access_key = os.getenv("AWS_ACCESS_KEY_ID")
+                secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
+                region = os.getenv("AWS_REGION")
+                if not all([access_key, secret_key, region]):
+                    raise ValueError("Missing AWS credentials or region. Check your .env file!")
+                import boto3  # type: ignore
+                _bedrock_client = boto3.client(
+                    service_name="bedrock-runtime",
+                    region_name=region,
+                    aws_access_key_id=access_key,
+                    aws_secret_access_key=secret_key
+                )
+    return _bedrock_client
+
+
+def motor_client(uri: str):
+    """
+    One AsyncIOMotorClient per URI. connect=False defers the topology (and
+    its monitor threads) to the first operation, which keeps the client
+    safe to create before a fork.
+    """
+    client = _motor_clients.get(uri)
+    if client is None:
+        with _lock:
+            client = _motor_clients.get(uri)
+            if client is None:
+                from motor.motor_asyncio import AsyncIOMotorClient  # type: ignore
+                client = _motor_clients[uri] = AsyncIOMotorClient(
+                    uri,
+                    connect=False,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+                )
+    return client
+
+
+def close_motor_clients() -> None:
+    with _lock:
+        clients = list(_motor_clients.values())
+        _motor_clients.clear()
+    for client in clients:
+        client.close()
+
+
+def pymongo_client(uri: str):
+    """One synchronous MongoClient per URI, same pool settings and connect=False as motor_client()."""
+    client = _pymongo_clients.get(uri)
+    if client is None:
+        with _lock:
+            client = _pymongo_clients.get(uri)
+            if client is None:
+                from pymongo import MongoClient
+                client = _pymongo_clients[uri] = MongoClient(
+                    uri,
+                    connect=False,
+                    maxPoolSize=MONGO_MAX_POOL_SIZE,
+                    minPoolSize=MONGO_MIN_POOL_SIZE,
+                    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS
+                )
+    return client
+
+
+def close_pymongo_clients() -> None:
+    with _lock:
+        clients = list(_pymongo_clients.values())
+        _pymongo_clients.clear()
+    for client in clients:
+        client.close()
+
+
+def preload() -> None:
+    """
+    Load the model weights before workers fork. Nothing is run through the
+    model here: torch's thread pools don't survive a fork, so the first
+    encode has to happen in the worker.
+    """
+    embedder()
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "embedders": sorted(_embedders),
+        "bedrock": _bedrock_client is not None,
+        "mongo_clients": len(_motor_clients),
+        "pymongo_clients": len(_pymongo_clients),
+        "preload": PRELOAD,
+    }
@@ -0,0 +1,58 @@
+"""
+Response serialization shared by the ai-backend services.
+
+Mongo documents go straight to orjson: ObjectId, Decimal128 and friends are
+handled by a `default` hook while encoding, so responses don't need a
+stringified copy of every dict and list first. datetime/date are native
+to orjson and come out as ISO 8601.
+
+Endpoints that return Mongo documents should return a MongoJSONResponse
+instance: FastAPI hands Response objects through untouched, whereas a plain
+dict return value is first copied by jsonable_encoder (which also can't
+encode ObjectId).
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Any
+
+import orjson  # type: ignore
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from fastapi.responses import JSONResponse
+
+from instrumentation import current_app, stage
+
+JSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY
+
+
+def default(obj: Any) -> Any:
+    """orjson fallback for the BSON types Mongo hands back."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        # str keeps the exact decimal; a float could silently round it
+        return str(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # Anything else (Binary, Timestamp, Regex, ...) as its str(), like json.dumps(default=str)
+    return str(obj)
+
+
+def dumps(content: Any, option: int = 0) -> bytes:
+    return orjson.dumps(content, default=default, option=JSON_OPTIONS | option)
+
+
+def dumps_lines(docs) -> bytes:
+    """NDJSON: one document per line, newline-terminated."""
+    return b"".join(orjson.dumps(d, default=default, option=JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE) for d in docs)
+
+
+class MongoJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson and the BSON default hook."""
+
+    def render(self, content: Any) -> bytes:
+        with stage(current_app.get(), "serialization"):
+            return dumps(content)
@@ -0,0 +1,78 @@
+"""
+All four ai-backend services in one ASGI app: skill analysis (main.py),
+partner shortlisting (partner.py), recommendations (recommendation.py) and
+instructor assignment (Instructor.py). Their routers are mounted at the
+same paths they have when run on their own, and they share one embedding
+model, one Bedrock client and one Motor client per URI (resources.py).
+
+    cd ai-backend
+    uvicorn server:app --port 8000                # single process
+    gunicorn -c gunicorn.conf.py server:app       # pre-fork, models shared copy-on-write
+
+The standalone apps (uvicorn recommendation:app, ...) keep working.
+"""
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import RedirectResponse
+
+import resources
+from instrumentation import instrument
+from profiling import profile_requests
+
+if resources.PRELOAD:
+    # Pre-fork mode: load the weights in the master, before the workers fork
+    resources.preload()
+
+import Instructor  # noqa: E402
+import main  # noqa: E402
+import partner  # noqa: E402
+import recommendation  # noqa: E402
+from serialization import MongoJSONResponse  # noqa: E402
+
+SERVICES = {
+    "skill-analysis": main,
+    "partner": partner,
+    "recommendations": recommendation,
+    "instructor-assignment": Instructor,
+}
+
+app = FastAPI(title="SkillNaav AI backend", version="2.0.0", default_response_class=MongoJSONResponse)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+for module in SERVICES.values():
+    app.include_router(module.router)
+instrument(app, "ai-backend")
+profile_requests(app, "ai-backend")
+
+@app.middleware("http")
+async def log_partner_requests(request: Request, call_next):
+    # partner.py logs every request when standalone; keep that to its own routes here
+    if request.url.path.startswith("/partner/"):
+        return await partner.log_requests(request, call_next)
+    return await call_next(request)
+
+@app.on_event("startup")
+def load_embedder():
+    # No-op after preload(); otherwise load at boot rather than on the first request
+    resources.embedder()
+
+@app.on_event("shutdown")
+def close_mongo():
+    # After every router's own shutdown hook, which may still need Mongo
+    resources.close_motor_clients()
+    resources.close_pymongo_clients()
+
+@app.get("/health")
+def health():
+    return {"ok": True, "services": list(SERVICES), "resources": resources.status()}
+
+@app.get("/")
+def root():
+    return RedirectResponse(url="/docs")
@@ -0,0 +1,141 @@
+"""
+Shared technical-skill vocabulary and normalization used by the resume
+analyzer (main.py) and partner shortlisting (partner.py).
+"""
+import re
+
+# Expanded predefined technical skills to improve extraction
+TECH_SKILLS = {
+    # Programming Languages
+    "python", "java", "javascript", "c++", "c#", "go", "rust", "swift", "kotlin", "scala",
+    "ruby", "php", "typescript", "r", "matlab", "perl", "shell", "bash",
+    
+    # Web Technologies
+    "html", "css", "react", "angular", "vue", "svelte", "node.js", "express.js", 
+    "django", "flask", "spring", "laravel", "rails", "asp.net", "jquery",
+    "bootstrap", "tailwind", "sass", "less", "webpack", "vite",
+    
+    # Databases
+    "sql", "mysql", "postgresql", "mongodb", "redis", "elasticsearch", "cassandra",
+    "oracle", "sqlite", "dynamodb", "neo4j", "influxdb",
+    
+    # Cloud & DevOps
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "ansible",
+    "jenkins", "gitlab", "github", "ci/cd", "nginx", "apache", "microservices",
+    
+    # Data Science & AI
+    "machine learning", "deep learning", "tensorflow", "pytorch", "keras", "pandas", 
+    "numpy", "scikit-learn", "matplotlib", "seaborn", "jupyter", "anaconda",
+    "spark", "hadoop", "kafka", "airflow", "mlflow",
+    
+    # Quantum Computing
+    "quantum computing", "quantum algorithms", "qubits", "circuit simulation",
+    "quantum gates", "quantum entanglement", "quantum superposition", "qiskit",
+    "cirq", "quantum annealing", "quantum cryptography",
+    
+    # Emerging Technologies
+    "blockchain", "ethereum", "solidity", "web3", "nft", "defi", "smart contracts",
+    "iot", "edge computing", "5g", "ar", "vr", "metaverse",
+    
+    # Tools & Methodologies
+    "git", "agile", "scrum", "kanban", "jira", "confluence", "slack", "teams",
+    "figma", "sketch", "photoshop", "illustrator", "unity", "unreal engine",
+    
+    # APIs & Protocols
+    "rest api", "graphql", "grpc", "websocket", "oauth", "jwt", "soap", "xml", "json",
+    
+    # Testing & Quality
+    "unit testing", "integration testing", "selenium", "cypress", "jest", "mocha",
+    "pytest", "junit", "tdd", "bdd", "code review",
+    
+    # Variations for common skills
+    "expressjs", "express.js", "react.js", "reactjs", "nodejs", "node.js",
+    "vue.js", "vuejs", "angular.js", "angularjs"
+}
+
+# Common variations and synonyms mapped to one canonical skill name
+SKILL_MAPPINGS = {
+    "nodejs": "node.js",
+    "node js": "node.js",
+    "expressjs": "express.js",
+    "express js": "express.js",
+    "reactjs": "react.js",
+    "react js": "react.js",
+    "vuejs": "vue.js",
+    "vue js": "vue.js",
+    "angularjs": "angular.js",
+    "angular js": "angular.js",
+    "c sharp": "c#",
+    "c plus plus": "c++",
+    "cpp": "c++",
+    "javascript": "javascript",
+    "js": "javascript",
+    "typescript": "typescript",
+    "ts": "typescript",
+    "artificial intelligence": "machine learning",
+    "ai": "machine learning",
+    "ml": "machine learning",
+    "deep learning": "deep learning",
+    "dl": "deep learning",
+    "quantum computing": "quantum computing",
+    "quantum algorithms": "quantum algorithms",
+    "circuit simulation": "circuit simulation",
+    "rest": "rest api",
+    "restful": "rest api",
+    "restful api": "rest api",
+    "continuous integration": "ci/cd",
+    "continuous deployment": "ci/cd",
+    "amazon web services": "aws",
+    "microsoft azure": "azure",
+    "google cloud": "gcp",
+    "google cloud platform": "gcp"
+}
+
+# Enhanced normalize skill names for better comparison
+def normalize_skill_name(skill):
+    """Normalize skill names for accurate comparison"""
+    if not skill:
+        return ""
+    
+    # Convert to lowercase and strip whitespace
+    skill = skill.lower().strip()
+    
+    # Remove special characters but keep dots, plus signs, and numbers
+    skill = re.sub(r'[^\w\s.#+]', '', skill)
+    
+    # Replace multiple spaces with single space
+    skill = re.sub(r'\s+', ' ', skill)
+    
+    # Remove spaces around dots
+    skill = re.sub(r'\s*\.\s*', '.', skill)
+    
+    return SKILL_MAPPINGS.get(skill, skill)
+
+# Reverse index: canonical skill -> every spelling that normalizes to it
+SKILL_VARIANTS = {}
+for _variant, _canonical in SKILL_MAPPINGS.items():
+    SKILL_VARIANTS.setdefault(_canonical, {_canonical}).add(_variant)
+
+def compile_skill_matcher(skills):
+    """
+    Builds one case-insensitive regex matching any of the given skills (or
+    their known variants) as whole terms. Returns (pattern, canonical_skills);
+    pattern.finditer(text) yields matches whose lastgroup indexes into
+    canonical_skills as "s<i>". Returns (None, []) when there are no skills.
+    """
+    canonical = []
+    for skill in skills:
+        norm = normalize_skill_name(skill)
+        if norm and norm not in canonical:
+            canonical.append(norm)
+    if not canonical:
+        return None, []
+
+    groups = []
+    for i, skill in enumerate(canonical):
+        variants = sorted(SKILL_VARIANTS.get(skill, {skill}), key=len, reverse=True)
+        alternation = "|".join(re.escape(v) for v in variants)
+        groups.append(f"(?P<s{i}>{alternation})")
+    # \b does not work next to '+', '#' or '.', so use explicit word-char guards
+    pattern = re.compile(r"(?<![\w.#+])(?:" + "|".join(groups) + r")(?![\w#+])", re.IGNORECASE)
+    return pattern, canonical
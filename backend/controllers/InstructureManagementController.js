@@ -10,6 +10,7 @@ const { issueOtp, verifyOtp, isVerified, clearOtp } = require("../utils/otpStore
 // ADD: S3 upload deps
 const { S3Client, PutObjectCommand } = require("@aws-sdk/client-s3");
 const crypto = require("crypto");
+const axios = require("axios");
 
 // ADD: S3 client
 const s3 = new S3Client({
@@ -20,6 +21,19 @@ const s3 = new S3Client({
     } : undefined,
 });
 
+// Tell the instructor-assignment service (Instructor.py) to drop its cached
+// /api/instructors pages; fire-and-forget, its cache TTL covers failures.
+// AI_BACKEND_ADMIN_TOKEN must match the one the Python service is started with.
+const invalidateInstructorCache = () => {
+    const base = (process.env.INSTRUCTOR_API_BASE_URL || "").replace(/\/+$/, "");
+    if (!base) return;
+    axios.post(`${base}/admin/invalidate-instructors`, null, {
+        timeout: 3000,
+        headers: { "X-Admin-Token": process.env.AI_BACKEND_ADMIN_TOKEN || "" },
+    })
+        .catch((err) => console.error("[instructors] cache invalidation failed:", err?.message || err));
+};
+
 // Map each field to a bucket from your .env
 const bucketFor = (field) => {
     if (field === "resume") return process.env.AWS_RESUME_BUCKET;
@@ -157,6 +171,7 @@ exports.createInstructure = async (req, res) => {
         try { clearOtp(emailToCheck); } catch (_) { }
         // <<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<  ADD THIS LINE  >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
 
+        invalidateInstructorCache();
         return res.status(201).json(created);
     } catch (err) {
         console.error("createInstructure error:", err);
@@ -231,6 +246,7 @@ exports.updateInstructure = async (req, res) => {
 
         const updated = await Instructure.findByIdAndUpdate(req.params.id, patch, { new: true });
         if (!updated) return res.status(404).json({ message: "Instructure not found." });
+        invalidateInstructorCache();
         return res.json(updated);
     } catch (err) {
         console.error("updateInstructure error:", err);
@@ -242,6 +258,7 @@ exports.deleteInstructure = async (req, res) => {
     try {
         const deleted = await Instructure.findByIdAndDelete(req.params.id);
         if (!deleted) return res.status(404).json({ message: "Instructure not found." });
+        invalidateInstructorCache();
         return res.json({ ok: true });
     } catch (err) {
         console.error("deleteInstructure error:", err);
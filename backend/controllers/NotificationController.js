@@ -54,7 +54,51 @@ res.status(201).json({ success: true, notification });
 };
 
 
+// 👉 Create many in-app notifications in one call (used by partner.py bulk rejections)
+// Body: { notifications: [{ studentId, title, message, link, type }] } — no emails are sent
+const createNotificationsBulk = async (req, res) => {
+  try {
+    const { notifications } = req.body;
+
+    if (!Array.isArray(notifications) || !notifications.length) {
+      return res.status(400).json({
+        success: false,
+        message: "notifications must be a non-empty array",
+      });
+    }
+
+    const docs = [];
+    const invalid = [];
+    notifications.forEach(({ studentId, title, message, link, type }, index) => {
+      if (!studentId || !title || !message || !mongoose.Types.ObjectId.isValid(studentId)) {
+        invalid.push(index);
+        return;
+      }
+      if (!type) {
+        if (title.toLowerCase().includes("offer")) type = "offer";
+        else if (title.toLowerCase().includes("recommendation")) type = "recommendation";
+        else type = "general";
+      }
+      docs.push({ studentId, title, message, link, type, isRead: false });
+    });
+
+    const inserted = docs.length
+      ? await Notification.insertMany(docs, { ordered: false })
+      : [];
 
+    res.status(201).json({
+      success: true,
+      created: inserted.length,
+      invalid,
+    });
+  } catch (error) {
+    console.error("Error creating notifications in bulk:", error);
+    res.status(500).json({
+      success: false,
+      message: "Failed to create notifications",
+    });
+  }
+};
 
 // 👉 Fetch all notifications for a student
 const getNotificationsByStudent = async (req, res) => {
@@ -134,6 +178,7 @@ const deleteNotification = async (req, res) => {
 
 module.exports = {
   createNotification,
+  createNotificationsBulk,
   getNotificationsByStudent,
   markNotificationAsRead,
   deleteNotification,
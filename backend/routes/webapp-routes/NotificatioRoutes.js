@@ -2,6 +2,7 @@ const express = require("express");
 const router = express.Router();
 const {
   createNotification,
+  createNotificationsBulk,
   getNotificationsByStudent,
   markNotificationAsRead,
   deleteNotification,
@@ -10,6 +11,9 @@ const {
 // ✅ Create/send a notification (can be called from partner.py)
 router.post("/", createNotification);
 
+// 📦 Create many in-app notifications at once (partner.py bulk rejections)
+router.post("/bulk", createNotificationsBulk);
+
 // 🔁 Get all notifications for a student
 router.get("/:studentId", getNotificationsByStudent);
 